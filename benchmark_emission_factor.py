@@ -0,0 +1,127 @@
+# Copyright (C) 2015, ENPC, INRIA
+# Author(s): Ruiwei Chen, Vivien Mallet
+#
+# This file is part of a program for the computation of air pollutant
+# emissions.
+#
+# This file is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 2.1 of the License, or (at your option)
+# any later version.
+#
+# This file is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this file. If not, see http://www.gnu.org/licenses/.
+
+# This file measures the time per call of the scalar emission factor methods,
+# and compares the resolution of the names used in their error messages by
+# reverse dictionary searches (as done before on every call) and by direct
+# indexing (as done now, and only when an exception is raised). Type 'python
+# benchmark_emission_factor.py'.
+
+import os
+import timeit
+import copert
+
+# The HDV parameter file is not distributed with the program. The HDV
+# benchmark is skipped if it is missing.
+hdv_parameter_file = "input/HDV_parameter.csv"
+if not os.path.isfile(hdv_parameter_file):
+    hdv_parameter_file = None
+
+cop = copert.Copert("input/PC_parameter.csv", "input/LDV_parameter.csv",
+                    hdv_parameter_file, "input/Moto_parameter.csv")
+
+# Number of calls per measurement.
+Ncall = 100000
+
+
+def per_call(function):
+    """Returns the best time per call, in microseconds, over 3 repetitions.
+    """
+    return min(timeit.repeat(function, number = Ncall, repeat = 3)) \
+        / Ncall * 1.e6
+
+
+def hdv():
+    try:
+        cop.HEFHeavyDutyVehicle(speed = 30.,
+                                vehicle_category
+                                = cop.vehicle_type_heavy_duty_vehicle,
+                                hdv_type = cop.hdv_type_rigid_14_20,
+                                hdv_copert_class = cop.class_hdv_Euro_III,
+                                pollutant = cop.pollutant_CO,
+                                load = cop.hdv_load_50,
+                                slope = cop.slope_4)
+    except Exception, e:
+        # Only the absence of formula for this vehicle category is expected.
+        if "no formula" not in str(e):
+            raise
+
+
+def motorcycle():
+    cop.EFMotorcycle(speed = 50., pollutant = cop.pollutant_CO,
+                     engine_type = cop.engine_type_moto_four_stroke_more_750,
+                     copert_class = cop.class_Euro_3)
+
+
+def gasoline_passenger_car():
+    cop.HEFGasolinePassengerCar(pollutant = cop.pollutant_CO, speed = 60.,
+                                copert_class = cop.class_Euro_4,
+                                engine_capacity
+                                = cop.engine_capacity_0p8_to_1p4)
+
+
+def hdv_name_reverse_search():
+    hdv_type = cop.hdv_type_rigid_14_20
+    load = cop.hdv_load_50
+    slope = cop.slope_4
+    cop.corr_hdv_type.keys()[cop.corr_hdv_type.values().index(hdv_type)]
+    cop.corr_slope.keys()[cop.corr_slope.values().index(slope)]
+    cop.corr_load.keys()[cop.corr_load.values().index(load)]
+
+
+def hdv_name_index():
+    hdv_type = cop.hdv_type_rigid_14_20
+    load = cop.hdv_load_50
+    slope = cop.slope_4
+    cop.name_hdv_type[hdv_type]
+    cop.name_slope[slope]
+    cop.name_load[load]
+
+
+def moto_name_reverse_search():
+    engine_type = cop.engine_type_moto_four_stroke_more_750
+    cop.corr_engine_type.keys()[cop.corr_engine_type.values()
+                                .index(engine_type)]
+
+
+def moto_name_index():
+    engine_type = cop.engine_type_moto_four_stroke_more_750
+    cop.name_moto_engine_type[cop.index_moto_engine_type[engine_type]]
+
+
+method = [("EFMotorcycle", motorcycle),
+          ("HEFGasolinePassengerCar", gasoline_passenger_car)]
+if hdv_parameter_file is None:
+    print "Skipping HEFHeavyDutyVehicle: \"input/HDV_parameter.csv\" is " \
+        + "missing."
+else:
+    method.insert(0, ("HEFHeavyDutyVehicle", hdv))
+for name, function in method:
+    print "%-25s %8.2f us/call" % (name, per_call(function))
+
+print
+print "Resolution of the names for the error messages:"
+print "%-25s %13s %13s" % ("", "reverse", "index")
+for name, reverse_search, index \
+        in [("HDV type, load, slope", hdv_name_reverse_search,
+             hdv_name_index),
+            ("Motorcycle engine type", moto_name_reverse_search,
+             moto_name_index)]:
+    print "%-25s %6.2f us/call %6.2f us/call" \
+        % (name, per_call(reverse_search), per_call(index))
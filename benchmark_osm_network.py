@@ -0,0 +1,97 @@
+# Copyright (C) 2015, ENPC, INRIA
+# Author(s): Ruiwei Chen, Vivien Mallet
+#
+# This file is part of a program for the computation of air pollutant
+# emissions.
+#
+# This file is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 2.1 of the License, or (at your option)
+# any later version.
+#
+# This file is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this file. If not, see http://www.gnu.org/licenses/.
+
+# This file compares the single-pass and the two-pass extraction of the
+# highways by 'osm_network.retrieve_highway', on a generated OSM file. Type
+# 'python benchmark_osm_network.py'.
+
+import os
+import tempfile
+import time
+import osm_network
+
+# The generated network is a grid of Nx x Ny nodes. Along the rows and the
+# columns of the grid, the highways link Nnode consecutive nodes.
+Nx = 1000
+Ny = 1000
+Nnode = 10
+# Number of cores used by the parser.
+Ncore = 4
+
+# The domain covers the center of the grid.
+x_min, x_max = 3.04, 3.06
+y_min, y_max = 45.74, 45.76
+selected_zone = [[x_min, y_max], [x_min, y_min], [x_max, y_min],
+                 [x_max, y_max], [x_min, y_max]]
+tolerance = 0.005
+
+
+def generate(osm_file):
+    """Writes the grid network in 'osm_file'. The longitudes range from 3.
+    to 3.1 and the latitudes from 45.7 to 45.8.
+    """
+    f = open(osm_file, "w")
+    f.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+    f.write("<osm version=\"0.6\" generator=\"benchmark\">\n")
+    for j in range(Ny):
+        for i in range(Nx):
+            f.write("  <node id=\"%d\" lat=\"%.7f\" lon=\"%.7f\"/>\n"
+                    % (1 + j * Nx + i, 45.7 + 0.1 * j / (Ny - 1),
+                       3. + 0.1 * i / (Nx - 1)))
+    way = 1
+    for j in range(Ny):
+        for i in range(0, Nx - 1, Nnode - 1):
+            f.write("  <way id=\"%d\">\n" % way)
+            for k in range(i, min(i + Nnode, Nx)):
+                f.write("    <nd ref=\"%d\"/>\n" % (1 + j * Nx + k))
+            f.write("    <tag k=\"highway\" v=\"residential\"/>\n"
+                    + "  </way>\n")
+            way += 1
+    for i in range(Nx):
+        for j in range(0, Ny - 1, Nnode - 1):
+            f.write("  <way id=\"%d\">\n" % way)
+            for k in range(j, min(j + Nnode, Ny)):
+                f.write("    <nd ref=\"%d\"/>\n" % (1 + k * Nx + i))
+            f.write("    <tag k=\"highway\" v=\"residential\"/>\n"
+                    + "  </way>\n")
+            way += 1
+    f.write("</osm>\n")
+    f.close()
+
+
+osm_file = os.path.join(tempfile.mkdtemp(), "benchmark.osm")
+generate(osm_file)
+print "Generated %s (%.1f MB)." \
+    % (osm_file, os.path.getsize(osm_file) / 1024. ** 2)
+
+result = {}
+for name, single_pass in [("two-pass", False), ("single-pass", True)]:
+    start = time.time()
+    result[name] \
+        = osm_network.retrieve_highway(osm_file, selected_zone, tolerance,
+                                       Ncore, single_pass = single_pass)
+    print "%-12s %8.2f s, %d highways" \
+        % (name, time.time() - start, len(result[name][1]))
+
+if sorted(zip(result["two-pass"][1], result["two-pass"][0])) \
+        != sorted(zip(result["single-pass"][1], result["single-pass"][0])):
+    raise Exception, "The two extractions do not return the same highways."
+
+os.remove(osm_file)
+os.rmdir(os.path.dirname(osm_file))
@@ -20,6 +20,11 @@
 
 import numpy
 import math
+import os
+import hashlib
+import tempfile
+import time
+import multiprocessing
 
 
 class Copert:
@@ -86,6 +91,11 @@ class Copert:
     engine_capacity_0p8_to_1p4 = 0
     engine_capacity_1p4_to_2 = 1
     engine_capacity_more_2 = 2
+    # All engine capacity categories.
+    engine_capacity_category = (engine_capacity_less_0p8,
+                                engine_capacity_0p8_to_1p4,
+                                engine_capacity_1p4_to_2,
+                                engine_capacity_more_2)
 
     # Definition of the vehicle type used by COPERT.
     vehicle_type_passenger_car = 0
@@ -146,6 +156,23 @@ class Copert:
     # Printed Names.
     name_pollutant = ["CO", "HC", "NOx", "PM", "FC", "VOC"]
 
+    # Status codes of the emission factors computed for arrays in batch mode
+    # (see the argument 'return_status' of the *Array methods).
+    status_valid = 0
+    status_speed_below_range = 1
+    status_speed_above_range = 2
+    status_no_formula = 3
+    status_invalid_speed = 4
+    ## Printed names of the status codes.
+    name_status = ["valid", "speed below the range of the formula",
+                   "speed above the range of the formula",
+                   "no formula for the vehicle category or the pollutant",
+                   "negative or undefined speed"]
+
+    # Treatments of the speeds out of the range of a formula, in the *Array
+    # methods (see their argument 'speed_policy').
+    name_speed_policy = ["raise", "clamp", "extrapolate", "nan"]
+
     # Definition of a general range of average speed for different road types,
     # in km/h.
     speed_type_urban = 60.
@@ -233,6 +260,57 @@ class Copert:
                             Eq_9, Eq_10, Eq_11, Eq_12, Eq_13, Eq_14, Eq_15,
                             Eq_16, Eq_17]
 
+    # Same equations as above, written with NumPy functions so that the
+    # coefficients and the speed may be arrays (of the same shape).
+    Eq_1_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 ((a + c * V + e * V**2 + f / V) / (1 + b * V + d * V**2)) \
+                 * (1 - rf)
+    Eq_2_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 ((a * V**2) + (b * V) + c + (d * numpy.log(V)) \
+                  + (e * numpy.exp(f * V)) + (g * (V**h))) * (1 - rf)
+    Eq_3_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 (a + b * (1 + numpy.exp( - (V + c) / d ))**-1 ) * (1 - rf)
+    Eq_4_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 (a * V**b ) * (1 - rf)
+    Eq_5_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 (((a * V**2) + (b * V) + c + (d * numpy.log(V)) \
+                   + (e * numpy.exp(f * V)) + (g * (V**h))) * (1 - rf)) \
+                 / 1000
+    Eq_6_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 (a + b / (1 + numpy.exp((-1 * c + d * numpy.log(V)) \
+                                         + e * V))) * (1 - rf)
+    Eq_7_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 ((a * V**3 + b * V**2) + c * V + d) * (1 - rf)
+    Eq_8_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 ((a * b**V * V**c)) * (1 - rf)
+    Eq_9_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                 ((a * V**b) + c * V**d) * (1 - rf)
+    Eq_10_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (1 / (a + b * V**c)) * (1 - rf)
+    Eq_11_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  ((a + b * V)**(-1 / c)) * (1 - rf)
+    Eq_12_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (1 / (c * V**2 + b * V + a)) * (1 - rf)
+    Eq_13_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  numpy.exp((a + b / V) + (c * numpy.log(V))) * (1 - rf)
+    Eq_14_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (e + a * numpy.exp(-1 * b * V) \
+                   + c * numpy.exp(-1 * d * V)) * (1 - rf)
+    Eq_15_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (a * V**2 + b * V + c) * (1 - rf)
+    Eq_16_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (a - b * numpy.exp(-1 * c * V**d)) * (1 - rf)
+    Eq_17_array = lambda self, a, b, c, d, e, f, g, h, rf, V : \
+                  (a * V**5 + b * V**4 + c * V**3 + d * V**2 + e * V + f) \
+                  * (1 - rf)
+
+    list_equation_pc_ldv_array = [Eq_1_array, Eq_2_array, Eq_3_array,
+                                  Eq_4_array, Eq_5_array, Eq_6_array,
+                                  Eq_7_array, Eq_8_array, Eq_9_array,
+                                  Eq_10_array, Eq_11_array, Eq_12_array,
+                                  Eq_13_array, Eq_14_array, Eq_15_array,
+                                  Eq_16_array, Eq_17_array]
+
 
     # Generic functions to calculate hot emissions factors for heavy duty
     # vehicles, buses and coaches. (ref. the attached annex Excel file of EMEP
@@ -283,6 +361,53 @@ class Copert:
                          Eq_hdv_10, Eq_hdv_11, Eq_hdv_12, Eq_hdv_13,
                          Eq_hdv_14, Eq_hdv_15]
 
+    # Same equations as above, written with NumPy functions so that the
+    # coefficients and the speed may be arrays (of the same shape).
+    Eq_hdv_0_array = lambda self, a, b, c, d, e, f, g, x: \
+                     (a * (b**x)) * (x**c)
+    Eq_hdv_1_array = lambda self, a, b, c, d, e, f, g, x: \
+                     (a * (x**b)) + (c * (x**d))
+    Eq_hdv_2_array = lambda self, a, b, c, d, e, f, g, x: \
+                     (a + (b * x))**((-1) / c)
+    Eq_hdv_3_array = lambda self, a, b, c, d, e, f, g, x: \
+                     (a + (b * x)) \
+                     + (((c - b) * (1 - numpy.exp(((-1) * d) * x))) / d)
+    Eq_hdv_4_array = lambda self, a, b, c, d, e, f, g, x: \
+                     (e + (a * numpy.exp(((-1) * b) * x))) \
+                     + (c * numpy.exp(((-1) * d) * x))
+    Eq_hdv_5_array = lambda self, a, b, c, d, e, f, g, x: \
+                     1 / (((c * (x**2)) + (b * x)) + a)
+    Eq_hdv_6_array = lambda self, a, b, c, d, e, f, g, x: \
+                     1 / (a + (b * (x**c)))
+    Eq_hdv_7_array = lambda self, a, b, c, d, e, f, g, x: \
+                     1 / (a + (b * x))
+    Eq_hdv_8_array = lambda self, a, b, c, d, e, f, g, x: \
+                     a - (b * numpy.exp(((-1) * c) * (x**d)))
+    Eq_hdv_9_array = lambda self, a, b, c, d, e, f, g, x: \
+                     a / (1 + (b * numpy.exp(((-1) * c) * x)))
+    Eq_hdv_10_array = lambda self, a, b, c, d, e, f, g, x: \
+                      a + (b / (1 + numpy.exp(((-1 * c) + (d * numpy.log(x)))
+                                              + (e * x))))
+    Eq_hdv_11_array = lambda self, a, b, c, d, e, f, g, x: \
+                      c + (a * numpy.exp(((-1) * b) * x))
+    Eq_hdv_12_array = lambda self, a, b, c, d, e, f, g, x: \
+                      c + (a * numpy.exp(b * x))
+    Eq_hdv_13_array = lambda self, a, b, c, d, e, f, g, x: \
+                      numpy.exp((a + (b / x)) + (c * numpy.log(x)))
+    Eq_hdv_14_array = lambda self, a, b, c, d, e, f, g, x: \
+                      ((a * (x**3)) + (b * (x**2)) + (c * x)) + d
+    Eq_hdv_15_array = lambda self, a, b, c, d, e, f, g, x: \
+                      ((a * (x**2)) + (b * x)) + c
+
+    list_equation_hdv_array = [Eq_hdv_0_array, Eq_hdv_1_array,
+                               Eq_hdv_2_array, Eq_hdv_3_array,
+                               Eq_hdv_4_array, Eq_hdv_5_array,
+                               Eq_hdv_6_array, Eq_hdv_7_array,
+                               Eq_hdv_8_array, Eq_hdv_9_array,
+                               Eq_hdv_10_array, Eq_hdv_11_array,
+                               Eq_hdv_12_array, Eq_hdv_13_array,
+                               Eq_hdv_14_array, Eq_hdv_15_array]
+
 
     # Generic functions to calculate hot emissions factors for two-stroke
     # motorcycles of engine displacement over 50 cm3.
@@ -564,25 +689,386 @@ NAN     NAN      NAN        NAN        NAN
     moped_parameter.shape = (2, 4, 5)
 
 
+    # Data table of the hot emission factor formulas for gasoline passenger
+    # cars of pre-Euro classes (ref. EEA emission inventory guidebook 2013,
+    # part 1.A.3.b, Road transportation, version updated in Sept. 2014). The
+    # dimensions are the copert class (from PRE_ECE to Open loop), the
+    # pollutant (CO, VOC, NOx), the engine capacity (0.8 - 1.4 l, 1.4 - 2.0
+    # l, > 2.0 l) and the speed segment (below and above the speed given in
+    # 'pre_euro_gasoline_speed_break'). Each line gives the coefficients a, b
+    # and c, and the number of the formula in 'list_pre_euro_function'. A
+    # line of NAN signifies that there is no formula for the engine capacity.
+    pre_euro_gasoline_parameter_string \
+        = """
+281.0      -0.63      0.0        3
+0.112      4.32       0.0        1
+281.0      -0.63      0.0        3
+0.112      4.32       0.0        1
+281.0      -0.63      0.0        3
+0.112      4.32       0.0        1
+30.34      -0.693     0.0        3
+1.247      0.0        0.0        0
+30.34      -0.693     0.0        3
+1.247      0.0        0.0        0
+30.34      -0.693     0.0        3
+1.247      0.0        0.0        0
+-0.00014   0.0225     1.173      2
+-0.00014   0.0225     1.173      2
+-4e-05     0.0217     1.36       2
+-4e-05     0.0217     1.36       2
+0.0001     0.03       1.5        2
+0.0001     0.03       1.5        2
+313.0      -0.76      0.0        3
+0.0032     -0.406     27.22      2
+313.0      -0.76      0.0        3
+0.0032     -0.406     27.22      2
+313.0      -0.76      0.0        3
+0.0032     -0.406     27.22      2
+24.99      -0.704     0.0        3
+4.85       -0.318     0.0        3
+24.99      -0.704     0.0        3
+4.85       -0.318     0.0        3
+24.99      -0.704     0.0        3
+4.85       -0.318     0.0        3
+-0.00014   0.0225     1.173      2
+-0.00014   0.0225     1.173      2
+-4e-05     0.0217     1.36       2
+-4e-05     0.0217     1.36       2
+0.0001     0.03       1.5        2
+0.0001     0.03       1.5        2
+300.0      -0.797     0.0        3
+0.0026     -0.44      26.26      2
+300.0      -0.797     0.0        3
+0.0026     -0.44      26.26      2
+300.0      -0.797     0.0        3
+0.0026     -0.44      26.26      2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+0.00018    -0.0037    1.479      2
+0.00018    -0.0037    1.479      2
+0.0002     -0.0038    1.663      2
+0.0002     -0.0038    1.663      2
+0.00022    -0.0039    1.87       2
+0.00022    -0.0039    1.87       2
+161.36     -45.62     0.0        5
+0.00377    -0.68      37.92      2
+161.36     -45.62     0.0        5
+0.00377    -0.68      37.92      2
+161.36     -45.62     0.0        5
+0.00377    -0.68      37.92      2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+25.75      -0.714     0.0        3
+9e-05      -0.019     1.95       2
+0.00025    -0.0084    1.616      2
+0.00025    -0.0084    1.616      2
+1.29       0.0099     0.0        4
+1.29       0.0099     0.0        4
+0.000294   -0.0112    2.784      2
+0.000294   -0.0112    2.784      2
+260.788    -0.91      0.0        3
+0.001163   -0.22      14.653     2
+260.788    -0.91      0.0        3
+0.001163   -0.22      14.653     2
+260.788    -0.91      0.0        3
+0.001163   -0.22      14.653     2
+19.079     -0.693     0.0        3
+0.000179   -0.037     2.608      2
+19.079     -0.693     0.0        3
+0.000179   -0.037     2.608      2
+19.079     -0.693     0.0        3
+0.000179   -0.037     2.608      2
+9.7e-05    0.003      1.432      2
+9.7e-05    0.003      1.432      2
+7.4e-05    0.013      1.484      2
+7.4e-05    0.013      1.484      2
+0.000266   -0.014     2.427      2
+0.000266   -0.014     2.427      2
+0.002478   -0.294     14.577     2
+0.002478   -0.294     14.577     2
+0.000957   -0.151     8.273      2
+0.000957   -0.151     8.273      2
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+0.000201   -0.034     2.189      2
+0.000201   -0.034     2.189      2
+0.000214   -0.034     1.999      2
+0.000214   -0.034     1.999      2
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+-0.926     0.719      0.0        5
+-0.926     0.719      0.0        5
+0.000247   0.0014     1.387      2
+0.000247   0.0014     1.387      2
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+0.002825   -0.377     17.882     2
+0.002825   -0.377     17.882     2
+0.002029   -0.23      9.446      2
+0.002029   -0.23      9.446      2
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+0.000256   -0.0423    2.185      2
+0.000256   -0.0423    2.185      2
+9.9e-05    -0.016     0.808      2
+9.9e-05    -0.016     0.808      2
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+-0.921     0.616      0.0        5
+-0.921     0.616      0.0        5
+-0.761     0.515      0.0        5
+-0.761     0.515      0.0        5
+NAN        NAN        NAN        NAN
+NAN        NAN        NAN        NAN
+"""
+    pre_euro_gasoline_parameter \
+        = numpy.fromstring(pre_euro_gasoline_parameter_string, sep = ' ')
+    pre_euro_gasoline_parameter.shape = (7, 3, 3, 2, 4)
+
+    # Speed (km/h) from which the second speed segment of
+    # 'pre_euro_gasoline_parameter' applies, for each copert class and
+    # pollutant.
+    pre_euro_gasoline_speed_break_string \
+        = """
+100.    100.    INF
+50.     50.     INF
+60.     60.     INF
+20.     60.     INF
+60.     60.     INF
+INF     INF     INF
+INF     INF     INF
+"""
+    pre_euro_gasoline_speed_break \
+        = numpy.fromstring(pre_euro_gasoline_speed_break_string, sep = ' ')
+    pre_euro_gasoline_speed_break.shape = (7, 3)
+
+    # Generic functions with the common arguments (a, b, c, x), indexed by
+    # the formula numbers of 'pre_euro_gasoline_parameter'. They are written
+    # with NumPy functions so that they apply to scalars and arrays.
+    list_pre_euro_function \
+        = [lambda self, a, b, c, x : a + 0. * x, # constant
+           lambda self, a, b, c, x : a * x + b, # linear
+           lambda self, a, b, c, x : a * x**2 + b * x + c, # quadratic
+           lambda self, a, b, c, x : a * x**b, # power
+           lambda self, a, b, c, x : a * numpy.exp(b * x), # exponential
+           lambda self, a, b, c, x : a + b * numpy.log(x)] # logarithm
+
+
+    # Arrays of coefficients that can be shared between processes (see
+    # PublishParameter and AttachParameter).
+    shared_parameter = ["pc_parameter", "ldv_parameter", "hdv_parameter",
+                        "moto_parameter", "efc_gasoline_passenger_car",
+                        "efc_gasoline_passenger_car_fc",
+                        "efc_diesel_passenger_car",
+                        "cold_start_emission_quotient",
+                        "ldv_parameter_pre_euro_1",
+                        "ldv_reduction_percentage", "moped_parameter",
+                        "pre_euro_gasoline_parameter",
+                        "pre_euro_gasoline_speed_break"]
+
+    # Names of the methods that read the parameter files, for the arrays
+    # loaded on first access.
+    parameter_reader = {"pc_parameter": "_ReadPCParameter",
+                        "ldv_parameter": "_ReadLDVParameter",
+                        "hdv_parameter": "_ReadHDVParameter",
+                        "moto_parameter": "_ReadMotoParameter"}
+
+
     def __init__(self, pc_parameter_file, ldv_parameter_file,
-                 hdv_parameter_file, moto_parameter_file):
-        """Constructor.
+                 hdv_parameter_file, moto_parameter_file,
+                 parameter_cache = None):
+        """Constructor. The parameter files are only read when the
+        coefficients of their vehicle category are first needed.
+
+        @param pc_parameter_file The CSV file of the coefficients for
+        passenger cars, or None if passenger cars are not used.
+
+        @param ldv_parameter_file The CSV file of the coefficients for light
+        commercial vehicles, or None if they are not used.
+
+        @param hdv_parameter_file The CSV file of the coefficients for heavy
+        duty vehicles and buses, or None if they are not used.
+
+        @param moto_parameter_file The CSV file of the coefficients for
+        motorcycles, or None if they are not used.
+
+        @param parameter_cache The path to a NumPy binary file (.npz) where
+        the parsed coefficients are cached, or None for no cache. An array is
+        read from the cache when the content hash of its CSV file is
+        unchanged. Otherwise, the CSV file is parsed and the array is written
+        in the cache.
         """
 
         # Correspondence between strings and integer attributes in this class
         # for light commercial vehicles, heavy duty vehicles and buses.
-        corr_pollutant = {"CO": self.pollutant_CO, "NOx": self.pollutant_NOx,
-                          "HC": self.pollutant_HC, "PM": self.pollutant_PM,
-                          "FC": self.pollutant_FC}
+        self.corr_pollutant = {"CO": self.pollutant_CO,
+                               "NOx": self.pollutant_NOx,
+                               "HC": self.pollutant_HC,
+                               "PM": self.pollutant_PM,
+                               "FC": self.pollutant_FC}
         self.index_pollutant = {self.pollutant_CO: 0, self.pollutant_NOx: 1,
                                 self.pollutant_HC: 2, self.pollutant_PM: 3,
                                 self.pollutant_FC: 4}
+        # Index of the pollutants in 'pre_euro_gasoline_parameter'.
+        self.index_pollutant_pre_euro = {self.pollutant_CO: 0,
+                                         self.pollutant_VOC: 1,
+                                         self.pollutant_NOx: 2}
+
+        # Parameter files of the arrays loaded on first access (see
+        # __getattr__).
+        self.parameter_file = {"pc_parameter": pc_parameter_file,
+                               "ldv_parameter": ldv_parameter_file,
+                               "hdv_parameter": hdv_parameter_file,
+                               "moto_parameter": moto_parameter_file}
+        self.parameter_cache = parameter_cache
+
+        # Index of the COPERT classes of passenger cars in 'pc_parameter'.
+        self.index_copert_class_pc = {self.class_Improved_Conventional: None,
+                                      self.class_Euro_1: None,
+                                      self.class_Euro_2: None,
+                                      self.class_Euro_3: None,
+                                      self.class_Euro_3_GDI: None,
+                                      self.class_Euro_4: None,
+                                      self.class_Euro_5: 0,
+                                      self.class_Euro_6: 1,
+                                      self.class_Euro_6c : 2}
+        self.index_copert_class_ldv = self.index_copert_class_pc
+
+        # Index of vehicle types of heavy duty vehicles (hdv) and buses.
+        self.index_vehicle_type \
+            = {self.vehicle_type_passenger_car: None,
+               self.vehicle_type_light_commercial_vehicle: None,
+               self.vehicle_type_heavy_duty_vehicle: 0,
+               self.vehicle_type_bus: 1,
+               self.vehicle_type_moped: None,
+               self.vehicle_type_motorcycle: None}
+        # Correspondence between strings and integer attributes in this class.
+        self.corr_hdv_type \
+            =  {"Gasoline >3.5 t": self.hdv_type_gasoline_3p5,
+                "Rigid <=7.5 t": self.hdv_type_rigid_7p5,
+                "Rigid 7.5 - 12 t": self.hdv_type_rigid_7p5_12,
+                "Rigid 12 - 14 t": self.hdv_type_rigid_12_14,
+                "Rigid 14 - 20 t": self.hdv_type_rigid_14_20,
+                "Rigid 20 - 26 t": self.hdv_type_rigid_20_26,
+                "Rigid 26 - 28 t": self.hdv_type_rigid_26_28,
+                "Rigid 28 - 32 t": self.hdv_type_rigid_28_32,
+                "Rigid >32 t": self.hdv_type_rigid_32,
+                "Articulated 14 - 20 t": self.hdv_type_articulated_14_20,
+                "Articulated 20 - 28 t": self.hdv_type_articulated_20_28,
+                "Articulated 28 - 34 t": self.hdv_type_articulated_28_34,
+                "Articulated 34 - 40 t": self.hdv_type_articulated_34_40,
+                "Articulated 40 - 50 t": self.hdv_type_articulated_40_50,
+                "Articulated 50 - 60 t": self.hdv_type_articulated_50_60,
+                "Urban Buses Midi <=15 t": self.bus_type_urban_less_15,
+                "Urban Buses Standard 15 - 18 t": self.bus_type_urban_15_18,
+                "Urban Buses Articulated >18 t": self.bus_type_urban_more_18,
+                "Coaches Standard <=18 t": self.bus_type_coach_standard_less_18,
+                "Coaches Articulated >18 t": self.bus_type_coach_articulated_more_18}
+        self.corr_load = {"0": self.hdv_load_0,
+                          "50": self.hdv_load_50,
+                          "100": self.hdv_load_100}
+        self.corr_slope = {"0%": self.slope_0,
+                           "-6%": self.slope_negative_6,
+                           "-4%": self.slope_negative_4,
+                           "-2%": self.slope_negative_2,
+                           "2%": self.slope_2,
+                           "4%": self.slope_4,
+                           "6%": self.slope_6}
+        # Names of the HDV types, loads and slopes, indexed by their integer
+        # attributes (which are contiguous from 0), for error messages.
+        self.name_hdv_type = sorted(self.corr_hdv_type,
+                                    key = self.corr_hdv_type.get)
+        self.name_load = sorted(self.corr_load, key = self.corr_load.get)
+        self.name_slope = sorted(self.corr_slope, key = self.corr_slope.get)
+
+        ## Correspondence between strings and integer attributes in this class
+        ## for motorcycles
+        self.corr_engine_type \
+            = {"2-Stroke": self.engine_type_moto_two_stroke_more_50,
+               "4-Stroke < 250": self.engine_type_moto_four_stroke_50_250,
+               "4-Stroke 250-750": self.engine_type_moto_four_stroke_250_750,
+               "4-Stroke > 750": self.engine_type_moto_four_stroke_more_750}
+        self.index_moto_engine_type \
+            = {self.engine_type_moto_two_stroke_more_50: 0,
+               self.engine_type_moto_four_stroke_50_250: 1,
+               self.engine_type_moto_four_stroke_250_750: 2,
+               self.engine_type_moto_four_stroke_more_750: 3}
+        # Names of the motorcycle engine types, indexed like
+        # 'moto_parameter', for error messages.
+        self.name_moto_engine_type = sorted(self.corr_engine_type,
+                                            key = self.corr_engine_type.get)
+        self.index_copert_class_moto = {self.class_Improved_Conventional: 0,
+                                        self.class_Euro_1: 1,
+                                        self.class_Euro_2: 2,
+                                        self.class_Euro_3: 3}
+
+        # Cache of the scalar methods, disabled by default (see EnableCache).
+        self.cache = None
+        self.cache_max_size = 0
+        self.cache_hit = 0
+        self.cache_miss = 0
+        # Number of cached calls in progress, so that the calls made by a
+        # cached method to other cached methods are not counted.
+        self.cache_depth = 0
+        return
+
 
-        # Updated hot emission factor coefficients and equations for gasoline
-        # and diesel passenger cars (PC) with emission standard higher than
-        # Euro 5. (Ref. the Excel file annex updated by Sept2014)
-        self.pc_parameter = numpy.empty((7, 3, 4, 12), dtype = float)
-        self.pc_parameter.fill(numpy.nan)
+    def __getattr__(self, name):
+        """Loads the parameter arrays ('pc_parameter', 'ldv_parameter',
+        'hdv_parameter' and 'moto_parameter') on first access. It is only
+        called when the attribute is not found, so that it costs nothing once
+        the array is loaded.
+        """
+        if name not in self.__dict__.get("parameter_file", {}):
+            raise AttributeError, name
+        value = self._LoadParameter(name)
+        setattr(self, name, value)
+        return value
+
+
+    def _LoadParameter(self, name):
+        """Reads a parameter array from the cache, or from its parameter file.
+
+        @param name The name of the array: "pc_parameter", "ldv_parameter",
+        "hdv_parameter" or "moto_parameter".
+
+        @return The parameter array.
+        """
+        filename = self.parameter_file[name]
+        if filename is None:
+            raise Exception, "No parameter file was provided for '" \
+                + name + "'."
+        reader = getattr(self, self.parameter_reader[name])
+        if self.parameter_cache is None:
+            return reader(filename)
+        parameter_hash = self._HashFile(filename)
+        cached = self._ReadParameterCache(self.parameter_cache,
+                                          {name: parameter_hash})
+        if name in cached:
+            return cached[name]
+        parameter = reader(filename)
+        self._WriteParameterCache(self.parameter_cache, name, parameter,
+                                  parameter_hash)
+        return parameter
+
+
+    def _ReadPCParameter(self, filename):
+        """Reads the hot emission factor coefficients and equations for
+        gasoline and diesel passenger cars (PC) with emission standard higher
+        than Euro 5. (Ref. the Excel file annex updated by Sept2014)
+
+        @param filename The CSV file of the coefficients.
+
+        @return The array of coefficients, with shape (7, 3, 4, 12).
+        """
+        pc_parameter = numpy.empty((7, 3, 4, 12), dtype = float)
+        pc_parameter.fill(numpy.nan)
         ## Correspondence between strings and integer attributes for passenger
         ## cars.
         corr_pc_engine_type = {"Gasoline <0.8 l": 0,
@@ -594,18 +1080,9 @@ NAN     NAN      NAN        NAN        NAN
                                "Diesel >2.0 l": 6}
         corr_pc_class = {"5": self.class_Euro_5, "6": self.class_Euro_6,
                          "6c": self.class_Euro_6c}
-        self.index_copert_class_pc = {self.class_Improved_Conventional: None,
-                                      self.class_Euro_1: None,
-                                      self.class_Euro_2: None,
-                                      self.class_Euro_3: None,
-                                      self.class_Euro_3_GDI: None,
-                                      self.class_Euro_4: None,
-                                      self.class_Euro_5: 0,
-                                      self.class_Euro_6: 1,
-                                      self.class_Euro_6c : 2}
         corr_pc_equation = {"Equation 1": 0, "Equation 6": 5,
                             "Equation 9": 8, "Equation 17": 16}
-        pc_file = open(pc_parameter_file, "r")
+        pc_file = open(filename, "r")
         for line in pc_file.readlines():
             line_split = [s.strip() for s in line.split(",")]
             if line_split[0] == "Sector":
@@ -613,29 +1090,37 @@ NAN     NAN      NAN        NAN        NAN
             i_pc_type = corr_pc_engine_type[line_split[1]]
             i_pc_copert_class \
                 = self.index_copert_class_pc[corr_pc_class[line_split[3]]]
-            i_pollutant = self.index_pollutant[corr_pollutant[line_split[4]]]
+            i_pollutant \
+                = self.index_pollutant[self.corr_pollutant[line_split[4]]]
             line_split[16] = corr_pc_equation[line_split[16]]
-            self.pc_parameter[i_pc_type, i_pc_copert_class, i_pollutant] \
+            pc_parameter[i_pc_type, i_pc_copert_class, i_pollutant] \
                 = [float(x) for x in line_split[5 : 17]]
         pc_file.close()
+        return pc_parameter
 
-        # Hot emission factor coefficients and equations for light commercial
-        # vehicles of emission standard higher than Euro 5. ("LDVs" for light
-        # duty vehicles in the Excel file of the inventory guide book.)
-        ## Initialization
-        self.ldv_parameter = numpy.empty((2, 3, 5, 12), dtype = float)
-        self.ldv_parameter.fill(numpy.nan)
+
+    def _ReadLDVParameter(self, filename):
+        """Reads the hot emission factor coefficients and equations for light
+        commercial vehicles of emission standard higher than Euro 5. ("LDVs"
+        for light duty vehicles in the Excel file of the inventory guide
+        book.)
+
+        @param filename The CSV file of the coefficients.
+
+        @return The array of coefficients, with shape (2, 3, 5, 12).
+        """
+        ldv_parameter = numpy.empty((2, 3, 5, 12), dtype = float)
+        ldv_parameter.fill(numpy.nan)
         ## Correspondence between strings and integer attributes in this class
         ## for light commercial vehicles
         corr_ldv_type = {"Gasoline <3.5 t": self.engine_type_gasoline,
                          "Diesel <3.5 t": self.engine_type_diesel}
-        corr_ldv_class = corr_pc_class
-        self.index_copert_class_ldv = self.index_copert_class_pc
-
+        corr_ldv_class = {"5": self.class_Euro_5, "6": self.class_Euro_6,
+                          "6c": self.class_Euro_6c}
         corr_ldv_equation = {"Equation 1": 0, "Equation 9": 8,
                              "Equation 12": 11, "Equation 16": 15,
                              "Equation 17": 16}
-        ldv_file = open(ldv_parameter_file, "r")
+        ldv_file = open(filename, "r")
         for line in ldv_file.readlines():
             line_split = [s.strip() for s in line.split(",")]
             if line_split[0] == "Sector":
@@ -643,52 +1128,29 @@ NAN     NAN      NAN        NAN        NAN
             i_ldv_type = corr_ldv_type[line_split[1]]
             i_ldv_copert_class \
                 = self.index_copert_class_ldv[corr_ldv_class[line_split[3]]]
-            i_pollutant = self.index_pollutant[corr_pollutant[line_split[4]]]
+            i_pollutant \
+                = self.index_pollutant[self.corr_pollutant[line_split[4]]]
             line_split[16] = corr_ldv_equation[line_split[16]]
-            self.ldv_parameter[i_ldv_type, i_ldv_copert_class, i_pollutant] \
+            ldv_parameter[i_ldv_type, i_ldv_copert_class, i_pollutant] \
                 = [float(x) for x in line_split[5 : 17]]
         ldv_file.close()
+        return ldv_parameter
+
+
+    def _ReadHDVParameter(self, filename):
+        """Reads the hot emission factor coefficients and equations for heavy
+        duty vehicles and buses.
 
-        # Hot emission factor coefficients and equations for heavy duty
-        # vehicles and buses.
-        # Converting the CSV file into a multidimensional
-        # array.  Initialization of parameters for heavy duty vehicles.
-        self.hdv_parameter = numpy.empty((2, 20, 8, 5, 3, 7, 10),
-                                         dtype = float)
-        self.hdv_parameter.fill(numpy.nan)
+        @param filename The CSV file of the coefficients.
 
+        @return The array of coefficients, with shape (2, 20, 8, 5, 3, 7,
+        10).
+        """
+        hdv_parameter = numpy.empty((2, 20, 8, 5, 3, 7, 10), dtype = float)
+        hdv_parameter.fill(numpy.nan)
         # Correspondence between strings and integer attributes in this class.
         corr_hdv_or_bus = {"HDV": self.vehicle_type_heavy_duty_vehicle,
                            "BUS": self.vehicle_type_bus}
-        # Index of vehicle types of heavy duty vehicles (hdv) and buses.
-        self.index_vehicle_type \
-            = {self.vehicle_type_passenger_car: None,
-               self.vehicle_type_light_commercial_vehicle: None,
-               self.vehicle_type_heavy_duty_vehicle: 0,
-               self.vehicle_type_bus: 1,
-               self.vehicle_type_moped: None,
-               self.vehicle_type_motorcycle: None}
-        self.corr_hdv_type \
-            =  {"Gasoline >3.5 t": self.hdv_type_gasoline_3p5,
-                "Rigid <=7.5 t": self.hdv_type_rigid_7p5,
-                "Rigid 7.5 - 12 t": self.hdv_type_rigid_7p5_12,
-                "Rigid 12 - 14 t": self.hdv_type_rigid_12_14,
-                "Rigid 14 - 20 t": self.hdv_type_rigid_14_20,
-                "Rigid 20 - 26 t": self.hdv_type_rigid_20_26,
-                "Rigid 26 - 28 t": self.hdv_type_rigid_26_28,
-                "Rigid 28 - 32 t": self.hdv_type_rigid_28_32,
-                "Rigid >32 t": self.hdv_type_rigid_32,
-                "Articulated 14 - 20 t": self.hdv_type_articulated_14_20,
-                "Articulated 20 - 28 t": self.hdv_type_articulated_20_28,
-                "Articulated 28 - 34 t": self.hdv_type_articulated_28_34,
-                "Articulated 34 - 40 t": self.hdv_type_articulated_34_40,
-                "Articulated 40 - 50 t": self.hdv_type_articulated_40_50,
-                "Articulated 50 - 60 t": self.hdv_type_articulated_50_60,
-                "Urban Buses Midi <=15 t": self.bus_type_urban_less_15,
-                "Urban Buses Standard 15 - 18 t": self.bus_type_urban_15_18,
-                "Urban Buses Articulated >18 t": self.bus_type_urban_more_18,
-                "Coaches Standard <=18 t": self.bus_type_coach_standard_less_18,
-                "Coaches Articulated >18 t": self.bus_type_coach_articulated_more_18}
         corr_tech = {"Conventional": self.class_hdv_Conventional,
                      "HD Euro I": self.class_hdv_Euro_I,
                      "HD Euro II": self.class_hdv_Euro_II,
@@ -697,17 +1159,7 @@ NAN     NAN      NAN        NAN        NAN
                      "HD Euro V - EGR": self.class_hdv_Euro_V_EGR,
                      "HD Euro V - SCR": self.class_hdv_Euro_V_SCR,
                      "HD Euro VI": self.class_hdv_Euro_VI}
-        self.corr_load = {"0": self.hdv_load_0,
-                          "50": self.hdv_load_50,
-                          "100": self.hdv_load_100}
-        self.corr_slope = {"0%": self.slope_0,
-                           "-6%": self.slope_negative_6,
-                           "-4%": self.slope_negative_4,
-                           "-2%": self.slope_negative_2,
-                           "2%": self.slope_2,
-                           "4%": self.slope_4,
-                           "6%": self.slope_6}
-        hdv_file = open(hdv_parameter_file, "r")
+        hdv_file = open(filename, "r")
         for line in hdv_file.readlines():
             line_split = [s.strip() for s in line.split(",")]
             if line_split[0] == "Type":
@@ -724,61 +1176,166 @@ NAN     NAN      NAN        NAN        NAN
                 = self.index_vehicle_type[corr_hdv_or_bus[line_split[0]]]
             i_hdv_type = self.corr_hdv_type[line_split[1]]
             i_hdv_tech = corr_tech[hdv_tech]
-            i_pollutant = self.index_pollutant[corr_pollutant[line_split[4]]]
+            i_pollutant \
+                = self.index_pollutant[self.corr_pollutant[line_split[4]]]
             i_hdv_load = self.corr_load[line_split[5]]
             i_hdv_slope = self.corr_slope[line_split[6]]
-            self.hdv_parameter[i_hdv_or_bus, i_hdv_type, i_hdv_tech,
-                               i_pollutant, i_hdv_load, i_hdv_slope] \
+            hdv_parameter[i_hdv_or_bus, i_hdv_type, i_hdv_tech,
+                          i_pollutant, i_hdv_load, i_hdv_slope] \
                 = [float(x) for x in line_split[8 : 18]]
         hdv_file.close()
+        return hdv_parameter
 
-        # Emission factor coefficients for motorcycles of engine displacement
-        # over 50 cm3. The data in the text file is based on the Table 3-69,
-        # Table 3-70, Table 3-71.
-        ## Initialization
-        self.moto_parameter = numpy.empty((4, 5, 4, 8), dtype = float)
-        self.moto_parameter.fill(numpy.nan)
-        ## Correspondence between strings and integer attributes in this class
-        ## for motorcycles
-        self.corr_engine_type \
-            = {"2-Stroke": self.engine_type_moto_two_stroke_more_50,
-               "4-Stroke < 250": self.engine_type_moto_four_stroke_50_250,
-               "4-Stroke 250-750": self.engine_type_moto_four_stroke_250_750,
-               "4-Stroke > 750": self.engine_type_moto_four_stroke_more_750}
-        self.index_moto_engine_type \
-            = {self.engine_type_moto_two_stroke_more_50: 0,
-               self.engine_type_moto_four_stroke_50_250: 1,
-               self.engine_type_moto_four_stroke_250_750: 2,
-               self.engine_type_moto_four_stroke_more_750: 3}
+
+    def _ReadMotoParameter(self, filename):
+        """Reads the emission factor coefficients for motorcycles of engine
+        displacement over 50 cm3. The data in the text file is based on the
+        Table 3-69, Table 3-70, Table 3-71.
+
+        @param filename The CSV file of the coefficients.
+
+        @return The array of coefficients, with shape (4, 5, 4, 8).
+        """
+        moto_parameter = numpy.empty((4, 5, 4, 8), dtype = float)
+        moto_parameter.fill(numpy.nan)
         corr_copert_class \
             = {"Conventional": self.class_Improved_Conventional,
                "Euro 1": self.class_Euro_1, "Euro 2": self.class_Euro_2,
                "Euro 3": self.class_Euro_3}
-        self.index_copert_class_moto = {self.class_Improved_Conventional: 0,
-                                        self.class_Euro_1: 1,
-                                        self.class_Euro_2: 2,
-                                        self.class_Euro_3: 3}
         ## Converting the CSV file into a multidimensional array.
-        moto_file = open(moto_parameter_file, "r")
+        moto_file = open(filename, "r")
         for line in moto_file.readlines():
             line_split = [s.strip() for s in line.split(",")]
             if line_split[0] == "Engine type":
                 continue
-            i_engine_type \
-                = self.index_moto_engine_type[self.corr_engine_type[line_split[0]]]
-            i_pollutant = self.index_pollutant[corr_pollutant[line_split[1]]]
-            i_copert_class \
-                = self.index_copert_class_moto[corr_copert_class[line_split[2]]]
-            self.moto_parameter[i_engine_type, i_pollutant,
-                                i_copert_class] \
+            engine_type = self.corr_engine_type[line_split[0]]
+            i_engine_type = self.index_moto_engine_type[engine_type]
+            i_pollutant \
+                = self.index_pollutant[self.corr_pollutant[line_split[1]]]
+            copert_class = corr_copert_class[line_split[2]]
+            i_copert_class = self.index_copert_class_moto[copert_class]
+            moto_parameter[i_engine_type, i_pollutant, i_copert_class] \
                 = [float(x) for x in line_split[3 : 11]]
         moto_file.close()
-        return
+        return moto_parameter
+
+
+    def _HashFile(self, filename):
+        """Returns the SHA-1 hash of the content of a file, in hexadecimal.
+        """
+        f = open(filename, "rb")
+        digest = hashlib.sha1(f.read()).hexdigest()
+        f.close()
+        return digest
+
+
+    def _ReadParameterCache(self, parameter_cache, parameter_hash):
+        """Reads the parameter arrays from a cache file.
+
+        @param parameter_cache The cache file (.npz).
+
+        @param parameter_hash The content hash of the parameter file of every
+        array, indexed by the array name.
+
+        @return The arrays whose source file has the same content hash as
+        when the cache was written, indexed by the array name. A missing or
+        unreadable cache file yields an empty dictionary.
+        """
+        if not os.path.isfile(parameter_cache):
+            return {}
+        try:
+            data = numpy.load(parameter_cache)
+            cached = {}
+            for name in parameter_hash:
+                if name in data.files and name + "_hash" in data.files \
+                   and str(data[name + "_hash"]) == parameter_hash[name]:
+                    cached[name] = data[name]
+            data.close()
+        except Exception:
+            return {}
+        return cached
+
+
+    def _WriteParameterCache(self, parameter_cache, name, parameter,
+                             parameter_hash):
+        """Writes a parameter array and the content hash of its source file
+        in a cache file, along with the arrays already in the cache. The file
+        is first written under a temporary name and then renamed, so that
+        concurrent processes never read a partial cache.
+
+        @param parameter_cache The cache file (.npz).
+
+        @param name The name of the array.
+
+        @param parameter The parameter array.
+
+        @param parameter_hash The content hash of the parameter file of the
+        array.
+        """
+        data = {}
+        if os.path.isfile(parameter_cache):
+            try:
+                cache = numpy.load(parameter_cache)
+                for key in cache.files:
+                    data[key] = cache[key]
+                cache.close()
+            except Exception:
+                data = {}
+        data[name] = parameter
+        data[name + "_hash"] = numpy.array(parameter_hash)
+        directory = os.path.dirname(os.path.abspath(parameter_cache))
+        descriptor, temporary = tempfile.mkstemp(suffix = ".npz",
+                                                 dir = directory)
+        f = os.fdopen(descriptor, "wb")
+        numpy.savez(f, **data)
+        f.close()
+        os.rename(temporary, parameter_cache)
+
+
+    def PublishParameter(self, directory):
+        """Writes the arrays of coefficients (see Copert.shared_parameter) in
+        NumPy binary files (.npy), so that other processes can attach to
+        them with AttachParameter. The parameter arrays whose file was not
+        provided to the constructor are skipped.
+
+        @param directory The directory where the files are written. It must
+        exist.
+        """
+        for name in self.shared_parameter:
+            if name in self.parameter_file and name not in self.__dict__ \
+               and self.parameter_file[name] is None:
+                continue
+            filename = os.path.join(directory, name + ".npy")
+            descriptor, temporary = tempfile.mkstemp(suffix = ".npy",
+                                                     dir = directory)
+            f = os.fdopen(descriptor, "wb")
+            numpy.save(f, getattr(self, name))
+            f.close()
+            os.rename(temporary, filename)
+
+
+    def AttachParameter(self, directory):
+        """Replaces the arrays of coefficients with read-only memory maps of
+        the files written by PublishParameter. All processes that attach to
+        the same files share a single copy of the coefficients in the page
+        cache, instead of holding private copies. A typical worker creates
+        'Copert(None, None, None, None)' and then calls this method.
+
+        @param directory The directory where PublishParameter wrote the
+        files. The arrays without file are left unchanged.
+        """
+        for name in self.shared_parameter:
+            filename = os.path.join(directory, name + ".npy")
+            if os.path.isfile(filename):
+                # A plain array view of the memory map, which is faster to
+                # index than numpy.memmap, with the same shared buffer.
+                parameter = numpy.load(filename, mmap_mode = "r")
+                setattr(self, name, parameter.view(numpy.ndarray))
 
 
     def Emission(self, pollutant, speed, distance, vehicle_type, engine_type,
                  copert_class, engine_capacity, ambient_temperature,
-                 **kwargs):
+                 avg_trip_length = None, **kwargs):
         """Computes the emissions in g.
 
         @param pollutant The pollutant for which the emissions are
@@ -803,16 +1360,22 @@ NAN     NAN      NAN        NAN        NAN
         @param engine_capacity The engine capacity in liter.
 
         @param ambient_temperature The ambient temperature in Celsius degrees.
+
+        @param avg_trip_length The average trip length in kilometers. If it
+        is provided, the cold-start emissions are added to the hot
+        emissions: the total emission factor is e_hot * (1 + beta * (e_cold
+        / e_hot - 1)), where beta is the cold mileage percentage. Otherwise,
+        only the hot emissions are computed.
         """
         if vehicle_type == self.vehicle_type_passenger_car:
             if engine_type == self.engine_type_gasoline:
-                return distance \
-                    * self.HEFGasolinePassengerCar(pollutant, speed,
+                emission_factor \
+                    = self.HEFGasolinePassengerCar(pollutant, speed,
                                                    copert_class,
                                                    engine_capacity, **kwargs)
             elif engine_type == self.engine_type_diesel:
-                return distance \
-                    * self.HEFDieselPassengerCar(pollutant, speed,
+                emission_factor \
+                    = self.HEFDieselPassengerCar(pollutant, speed,
                                                  copert_class,
                                                  engine_capacity, **kwargs)
             else:
@@ -821,32 +1384,669 @@ NAN     NAN      NAN        NAN        NAN
         else:
             raise Exception, "Only emission factors for passenger cars " \
                 + "are available."
+        if avg_trip_length is not None:
+            quotient \
+                = self.ColdStartEmissionQuotient(vehicle_type, engine_type,
+                                                 pollutant, speed,
+                                                 copert_class,
+                                                 engine_capacity,
+                                                 ambient_temperature)
+            beta = self.ColdStartMileagePercentage(vehicle_type, engine_type,
+                                                   pollutant, copert_class,
+                                                   engine_capacity,
+                                                   ambient_temperature,
+                                                   avg_trip_length)
+            emission_factor *= 1. + beta * (quotient - 1.)
+        return distance * emission_factor
 
 
-    # Definition of Hot Emission Factor (HEF) for gasoline passenger cars.
-    def HEFGasolinePassengerCar(self, pollutant, speed, copert_class,
-                                engine_capacity, **kwargs):
-        """Computes the hot emissions factor in g/km for gasoline passenger
-        cars, except for fuel consumption-dependent emissions (SO2, Pb,
-        heavy metals).
+    def EmissionArray(self, pollutant, speed, distance, vehicle_type,
+                      engine_type, copert_class, engine_capacity,
+                      ambient_temperature = None, avg_trip_length = None,
+                      **kwargs):
+        """Computes the emissions in g for arrays of inputs, e.g. one element
+        per link, or per link and per hour. This is the vectorized version
+        of Emission, which returns the same values element-wise.
 
         @param pollutant The pollutant for which the emissions are
         computed. It can be any of Copert.pollutant_*.
 
-        @param speed The average velocity of the vehicles in kilometers per
-        hour.
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
 
-        @param copert_class The vehicle class, which can be any of the
-        Copert.class_* attributes. They are introduced in the EMEP/EEA
-        emission inventory guidebook.
+        @param distance The total distance covered by all the vehicles, in
+        kilometers.
 
-        @param engine_capacity The engine capacity in liter.
+        @param ambient_temperature The ambient temperature in Celsius
+        degrees. It is only used with 'avg_trip_length'.
+
+        @param avg_trip_length The average trip length in kilometers. If it
+        is provided, the cold-start emissions are added to the hot
+        emissions, as in Emission.
+
+        The distances, vehicle types, engine types, classes, capacities,
+        ambient temperatures and trip lengths are scalars or arrays that can
+        be broadcast against 'speed'.
+
+        @return The array of the emissions in g.
         """
+        cold = avg_trip_length is not None
+        if cold and ambient_temperature is None:
+            raise Exception, "The ambient temperature is required to " \
+                + "compute the cold-start emissions."
+        elif not cold:
+            ambient_temperature, avg_trip_length = 0., 0.
+        V, distance, vehicle_type, engine_type, copert_class, \
+            engine_capacity, ambient_temperature, avg_trip_length \
+            = self._BroadcastArray(speed, distance, vehicle_type,
+                                   engine_type, copert_class,
+                                   engine_capacity, ambient_temperature,
+                                   avg_trip_length)
+        if (vehicle_type != self.vehicle_type_passenger_car).any():
+            raise Exception, "Only emission factors for passenger cars " \
+                + "are available."
+        if ((engine_type != self.engine_type_gasoline)
+            & (engine_type != self.engine_type_diesel)).any():
+            raise Exception, "Only emission factors for gasoline and " \
+                + "diesel vehicles are available."
+        emission_factor = numpy.empty(V.shape, dtype = float)
+        list_hef = [self._HEFGasolinePassengerCarArray,
+                    self._HEFDieselPassengerCarArray]
+        name = ["gasoline passenger cars", "diesel passenger cars"]
+        for t in [self.engine_type_gasoline, self.engine_type_diesel]:
+            selection = engine_type == t
+            ef, invalid = list_hef[t](pollutant, V[selection],
+                                      copert_class[selection],
+                                      engine_capacity[selection])
+            self._CheckArray(invalid, name[t])
+            emission_factor[selection] = ef
+        if cold:
+            quotient = self.ColdStartEmissionQuotientArray(
+                vehicle_type, engine_type, pollutant, V, copert_class,
+                engine_capacity, ambient_temperature)
+            beta = self.ColdStartMileagePercentageArray(
+                vehicle_type, engine_type, pollutant, copert_class,
+                engine_capacity, ambient_temperature, avg_trip_length)
+            emission_factor *= 1. + beta * (quotient - 1.)
+        return distance * emission_factor
 
-        if speed == 0.0:
-            return 0.0
+
+    def LinkEmission(self, pollutant, speed, length, flow, fleet,
+                     copert_class = None, engine_capacity = None,
+                     deduplicate = True, ambient_temperature = None,
+                     avg_trip_length = None, speed_policy = None, **kwargs):
+        """Computes the hot emissions of passenger cars on every link of a
+        network, in one vectorized pass over the links.
+
+        By default, the speeds are clipped to [10, 130] km/h, the range of
+        the formulas for classes up to Euro 4. With 'speed_policy', each
+        vehicle category is rather evaluated with the range of its own
+        formula. The vehicle categories for which there is no formula for
+        the pollutant (e.g., diesel Euro 1 to Euro 3 cars below 1.4 l) are
+        excluded from the sum.
+
+        Many links usually share the same fleet composition. With
+        'deduplicate', the fleet rows are reduced to a table of unique
+        profiles, the fleet-weighted emission factor is computed once per
+        unique (profile, speed) pair, and it is then broadcast back to the
+        links. Within a pair, only the categories present in the profile are
+        evaluated.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*, or a list of them, in
+        which case all pollutants are computed in one pass.
+
+        @param speed The average velocity on each link in kilometers per
+        hour, with shape (N,).
+
+        @param length The length of each link in kilometers, with shape (N,).
+
+        @param flow The vehicle flow on each link, with shape (N,), e.g. in
+        veh/h.
+
+        @param fleet The proportion of the flow in each vehicle category,
+        with shape (N, 2, Nclass, Ncapacity). The second dimension is the
+        engine type (Copert.engine_type_gasoline or
+        Copert.engine_type_diesel), the third one is indexed like
+        'copert_class' and the last one is indexed like 'engine_capacity'.
+
+        @param copert_class The list of the COPERT classes of the third
+        dimension of 'fleet'. By default, it is all Copert.class_*, from
+        Copert.class_PRE_ECE to Copert.class_Euro_6c.
+
+        @param engine_capacity The list of the engine capacities of the last
+        dimension of 'fleet'. By default, it is
+        [Copert.engine_capacity_0p8_to_1p4, Copert.engine_capacity_1p4_to_2,
+        Copert.engine_capacity_more_2].
+
+        @param deduplicate Whether the emission factors are computed per
+        unique (fleet profile, speed) pair rather than per link.
+
+        @param ambient_temperature The ambient temperature in Celsius
+        degrees, as a scalar or with shape (N,). It is only used with
+        'avg_trip_length'.
+
+        @param avg_trip_length The average trip length in kilometers, as a
+        scalar or with shape (N,). If it is provided, the cold-start
+        emissions are added to the hot emissions, as in Emission, for the
+        vehicle categories with cold-start formulas at the speed and
+        temperature of the link. The emission factors are then computed per
+        unique (fleet profile, speed, temperature, trip length) tuple.
+
+        @param speed_policy If None, the speeds are clipped to [10, 130]
+        km/h. Otherwise, the speeds are not clipped, and this is the
+        treatment of the speeds out of the range of the formula of a vehicle
+        category, as in HEFGasolinePassengerCarArray: "raise" (an exception
+        is raised), "clamp", "extrapolate" or "nan" (the emissions of the
+        link are NaN). The links with negative or undefined speeds get NaN,
+        except with "raise".
+
+        @return The emissions on each link in g (per time unit of the flow),
+        with shape (N,), or (Npollutant, N) for a list of pollutants.
+        """
+        fleet, copert_class, engine_capacity \
+            = self._FleetArray(fleet, copert_class, engine_capacity)
+        V = self._LinkSpeedArray(speed, speed_policy)
+        cold = self._ColdArray(V.shape, ambient_temperature, avg_trip_length)
+        multiple = isinstance(pollutant, (list, tuple, numpy.ndarray))
+        if multiple:
+            pollutant_list = list(pollutant)
         else:
-            V = speed
+            pollutant_list = [pollutant]
+
+        if deduplicate and len(V) > 1:
+            profile, i_profile = self._UniqueRow(fleet)
+        else:
+            profile, i_profile = fleet, None
+        # The comparisons of undefined speeds (NaN) must not warn.
+        with numpy.errstate(invalid = "ignore"):
+            emission_factor \
+                = self._FleetEmissionFactorArray(pollutant_list, V, profile,
+                                                 i_profile, copert_class,
+                                                 engine_capacity, cold,
+                                                 speed_policy)
+        if not multiple:
+            emission_factor = emission_factor[0]
+
+        return emission_factor * numpy.asarray(flow, dtype = float) \
+            * numpy.asarray(length, dtype = float)
+
+
+    def _LinkSpeedArray(self, speed, speed_policy):
+        """Converts the link speeds into an array of floats, clipped to [10,
+        130] km/h if there is no speed policy (see LinkEmission).
+        """
+        V = numpy.asarray(speed, dtype = float)
+        if speed_policy is None:
+            return numpy.clip(V, 10., 130.)
+        if speed_policy not in self.name_speed_policy:
+            raise Exception, "Unknown speed policy \"" + str(speed_policy) \
+                + "\". It must be one of \"" \
+                + "\", \"".join(self.name_speed_policy) + "\"."
+        return V
+
+
+    def _ColdArray(self, shape, ambient_temperature, avg_trip_length):
+        """Broadcasts the ambient temperatures and the average trip lengths
+        to a given shape, for the cold-start emissions.
+
+        @return The list of the two broadcast arrays, or None if there is no
+        trip length (hot emissions only).
+        """
+        if avg_trip_length is None:
+            return None
+        if ambient_temperature is None:
+            raise Exception, "The ambient temperature is required to " \
+                + "compute the cold-start emissions."
+        return [numpy.broadcast_to(numpy.asarray(x, dtype = float), shape)
+                for x in (ambient_temperature, avg_trip_length)]
+
+
+    def _FleetArray(self, fleet, copert_class, engine_capacity):
+        """Converts the fleet proportions into an array and checks its shape,
+        after the default COPERT classes and engine capacities of
+        LinkEmission are set.
+
+        @return The fleet array, the COPERT classes and the engine
+        capacities.
+        """
+        if copert_class is None:
+            copert_class = range(self.class_PRE_ECE, self.class_Euro_6c + 1)
+        if engine_capacity is None:
+            engine_capacity = [self.engine_capacity_0p8_to_1p4,
+                               self.engine_capacity_1p4_to_2,
+                               self.engine_capacity_more_2]
+        fleet = numpy.asarray(fleet, dtype = float)
+        if fleet.shape[1:] != (2, len(copert_class), len(engine_capacity)):
+            raise Exception, "The fleet must have shape (N, 2, " \
+                + str(len(copert_class)) + ", " \
+                + str(len(engine_capacity)) + ")."
+        return fleet, copert_class, engine_capacity
+
+
+    def _FleetEmissionFactorArray(self, pollutant_list, V, profile,
+                                  i_profile, copert_class, engine_capacity,
+                                  cold = None, speed_policy = None):
+        """Computes the fleet-weighted hot emission factors of passenger
+        cars. The vehicle categories for which there is no formula are
+        excluded from the sum.
+
+        @param pollutant_list The list of the pollutants.
+
+        @param V The array of speeds, within the range of the formulas if
+        'speed_policy' is None.
+
+        @param profile The fleet profiles, with shape (Nprofile, 2, Nclass,
+        Ncapacity).
+
+        @param i_profile The index of the fleet profile of every speed, with
+        the shape of 'V'. The emission factors are then computed once per
+        unique (profile, speed) pair. If None, 'profile' holds one fleet per
+        element of V (in flat order), and no pair is searched.
+
+        @param copert_class The list of the COPERT classes of 'profile'.
+
+        @param engine_capacity The list of the engine capacities of
+        'profile'.
+
+        @param cold The ambient temperatures and the average trip lengths,
+        as two arrays with the shape of 'V'. If provided, the cold-start
+        emissions are added, for the vehicle categories for which there are
+        formulas for the cold-start emission quotient and the cold mileage
+        percentage. The other categories only contribute their hot
+        emissions.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        the formula of a vehicle category (see LinkEmission), or None if the
+        speeds are within the range of the formulas.
+
+        @return The emission factors with shape (Npollutant,) + V.shape.
+        """
+        variable = [V.ravel()]
+        if cold is not None:
+            variable += [numpy.ravel(x) for x in cold]
+        # The emission factors are computed for the elements 'i_first' of
+        # the variables, with the fleet profiles 'profile[i_profile_pair]'.
+        # The unique (profile, variables) tuples are numbered by combining
+        # the variables one after the other.
+        if i_profile is not None:
+            i_pair = numpy.ravel(i_profile)
+            for x in variable:
+                x_unique, i_x = numpy.unique(x, return_inverse = True)
+                pair, i_first, i_pair \
+                    = numpy.unique(i_pair * len(x_unique) + i_x,
+                                   return_index = True,
+                                   return_inverse = True)
+            i_profile_pair = numpy.ravel(i_profile)[i_first]
+            variable = [x[i_first] for x in variable]
+        else:
+            i_profile_pair = numpy.arange(V.size)
+            i_pair = None
+        V_pair = variable[0]
+
+        list_hef = [self._HEFGasolinePassengerCarMultiArray,
+                    self._HEFDieselPassengerCarMultiArray]
+        emission_factor = numpy.zeros((len(pollutant_list), len(V_pair)),
+                                      dtype = float)
+        for t in [self.engine_type_gasoline, self.engine_type_diesel]:
+            for i_class, c in enumerate(copert_class):
+                for i_capacity, k in enumerate(engine_capacity):
+                    proportion \
+                        = profile[i_profile_pair, t, i_class, i_capacity]
+                    present = proportion != 0.
+                    if not present.any():
+                        continue
+                    V_present, C, K = self._BroadcastArray(V_pair[present],
+                                                           c, k)
+                    if speed_policy is None:
+                        ef, invalid = list_hef[t](pollutant_list, V_present,
+                                                  C, K)
+                        ef[invalid] = 0.
+                    else:
+                        ef = self._PolicyPassengerCarArray(t, pollutant_list,
+                                                           V_present, C, K,
+                                                           speed_policy)
+                    if cold is not None:
+                        T, vehicle, engine, L \
+                            = self._BroadcastArray(
+                                variable[1][present],
+                                self.vehicle_type_passenger_car, t,
+                                variable[2][present])
+                        for j, pollutant in enumerate(pollutant_list):
+                            quotient, invalid_quotient \
+                                = self._ColdStartEmissionQuotientArray(
+                                    vehicle, engine, pollutant, V_present, C,
+                                    K, T)
+                            beta, invalid_beta \
+                                = self._ColdStartMileagePercentageArray(
+                                    vehicle, engine, pollutant, C, K, T, L)
+                            hot = invalid_quotient | invalid_beta
+                            ef[j, ~hot] *= 1. + beta[~hot] \
+                                * (quotient[~hot] - 1.)
+                    emission_factor[:, present] += proportion[present] * ef
+        if i_pair is not None:
+            emission_factor = emission_factor[:, i_pair]
+        return emission_factor.reshape((len(pollutant_list),) + V.shape)
+
+
+    def _PolicyPassengerCarArray(self, engine_type, pollutant_list, V,
+                                 copert_class, engine_capacity,
+                                 speed_policy):
+        """Computes the hot emission factors of one engine type of passenger
+        cars for a list of pollutants, with a speed policy (see
+        LinkEmission). The emission factors of the vehicle categories
+        without formula for the pollutant, at any speed, are set to zero, so
+        that they are excluded from the fleet sums. Those of the speeds left
+        without formula by the policy, and of the negative or undefined
+        speeds, are NaN.
+
+        @return The emission factors with shape (Npollutant,) + V.shape.
+        """
+        if engine_type == self.engine_type_gasoline:
+            method = self.HEFGasolinePassengerCarArray
+            kernel = self._HEFGasolinePassengerCarArray
+            name = "gasoline"
+        else:
+            method = self.HEFDieselPassengerCarArray
+            kernel = self._HEFDieselPassengerCarArray
+            name = "diesel"
+        emission_factor = numpy.empty((len(pollutant_list),) + V.shape,
+                                      dtype = float)
+        for j, pollutant in enumerate(pollutant_list):
+            ef, status = method(pollutant, V, copert_class, engine_capacity,
+                                return_status = True, fill_value = numpy.nan,
+                                speed_policy = speed_policy)
+            # The categories without formula are those without formula
+            # within their speed range.
+            Vmin, Vmax \
+                = self._SpeedRangePassengerCarArray(engine_type, pollutant,
+                                                    copert_class,
+                                                    engine_capacity)
+            no_formula = numpy.isnan(Vmin) \
+                | kernel(pollutant, numpy.clip(V, Vmin, Vmax), copert_class,
+                         engine_capacity)[1]
+            no_formula &= V >= 0.
+            if speed_policy == "raise":
+                out = (status != self.status_valid) & ~no_formula
+                if out.any():
+                    raise Exception, "The speed is out of the range of the " \
+                        + "formula, or invalid, for " \
+                        + str(numpy.count_nonzero(out)) + " of the " \
+                        + str(out.size) + " speeds of " + name \
+                        + " passenger cars with COPERT class " \
+                        + self.name_class_euro[int(copert_class.flat[0])] \
+                        + "."
+            ef[no_formula] = 0.
+            emission_factor[j] = ef
+        return emission_factor
+
+
+    def TimeSeriesLinkEmission(self, pollutant, speed, length, flow, fleet,
+                               copert_class = None, engine_capacity = None,
+                               time_chunk = 24, output = None,
+                               ambient_temperature = None,
+                               avg_trip_length = None, speed_policy = None):
+        """Computes the hot emissions of passenger cars on every link of a
+        network and at every time step (e.g., every hour of a year), with a
+        fleet composition that does not depend on time. The time steps are
+        processed by chunks, so that the speeds and flows can be
+        memory-mapped arrays larger than the memory, and every chunk of
+        emissions is written in 'output' as soon as it is computed.
+
+        The unique fleet profiles are searched once for all time steps, and
+        the emission factors are computed once per unique (profile, speed)
+        pair in a chunk. See LinkEmission for the other conventions.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*, or a list of them.
+
+        @param speed The average velocity on each link and at each time step
+        in kilometers per hour, with shape (N, T).
+
+        @param length The length of each link in kilometers, with shape (N,).
+
+        @param flow The vehicle flow on each link and at each time step, with
+        shape (N, T), e.g. in veh/h.
+
+        @param fleet The proportion of the flow in each vehicle category,
+        with shape (N, 2, Nclass, Ncapacity). See LinkEmission.
+
+        @param copert_class The list of the COPERT classes of the third
+        dimension of 'fleet'. See LinkEmission.
+
+        @param engine_capacity The list of the engine capacities of the last
+        dimension of 'fleet'. See LinkEmission.
+
+        @param time_chunk The number of time steps in a chunk.
+
+        @param output The array where the emissions are written, with shape
+        (N, T), or (Npollutant, N, T) for a list of pollutants. It can also
+        be the name of a NumPy binary file (.npy), which is then created as
+        a memory-mapped array and flushed after every chunk. By default, a
+        new array is allocated.
+
+        @param ambient_temperature The ambient temperature in Celsius
+        degrees, as a scalar, or with shape (N, T), (T,) (e.g., hourly
+        temperatures shared by all links) or (N, 1). It is only used with
+        'avg_trip_length'.
+
+        @param avg_trip_length The average trip length in kilometers, as a
+        scalar or with a shape like 'ambient_temperature'. If it is
+        provided, the cold-start emissions are added to the hot emissions,
+        as in LinkEmission.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        the formulas. By default, the speeds are clipped to [10, 130] km/h.
+        See LinkEmission.
+
+        @return The emissions on each link and at each time step in g (per
+        time unit of the flow), with shape (N, T) or (Npollutant, N, T).
+        """
+        if time_chunk < 1:
+            raise Exception, "The time chunk must be at least 1."
+        fleet, copert_class, engine_capacity \
+            = self._FleetArray(fleet, copert_class, engine_capacity)
+        length = numpy.asarray(length, dtype = float)
+        N, T = speed.shape
+        if flow.shape != (N, T):
+            raise Exception, "The speed and the flow must have the same " \
+                + "shape (N, T)."
+        multiple = isinstance(pollutant, (list, tuple, numpy.ndarray))
+        if multiple:
+            pollutant_list = list(pollutant)
+            shape = (len(pollutant_list), N, T)
+        else:
+            pollutant_list = [pollutant]
+            shape = (N, T)
+        if output is None:
+            output = numpy.empty(shape, dtype = float)
+        elif isinstance(output, str):
+            output = numpy.lib.format.open_memmap(output, mode = "w+",
+                                                  dtype = float,
+                                                  shape = shape)
+        elif output.shape != shape:
+            raise Exception, "The output array must have shape " \
+                + str(shape) + "."
+
+        cold = self._ColdArray((N, T), ambient_temperature, avg_trip_length)
+        profile, i_profile = self._UniqueRow(fleet)
+        for start in range(0, T, time_chunk):
+            end = min(start + time_chunk, T)
+            V = self._LinkSpeedArray(speed[:, start:end], speed_policy)
+            i_profile_chunk = numpy.repeat(i_profile[:, None], end - start,
+                                           axis = 1)
+            if cold is None:
+                cold_chunk = None
+            else:
+                cold_chunk = [x[:, start:end] for x in cold]
+            with numpy.errstate(invalid = "ignore"):
+                emission_factor \
+                    = self._FleetEmissionFactorArray(pollutant_list, V,
+                                                     profile,
+                                                     i_profile_chunk,
+                                                     copert_class,
+                                                     engine_capacity,
+                                                     cold_chunk, speed_policy)
+            if not multiple:
+                emission_factor = emission_factor[0]
+            output[..., start:end] = emission_factor \
+                * numpy.asarray(flow[:, start:end], dtype = float) \
+                * length[:, None]
+            if isinstance(output, numpy.memmap):
+                output.flush()
+        return output
+
+
+    def _UniqueRow(self, array):
+        """Finds the unique rows of an array. The rows are hashed into
+        scalar keys, which are much faster to sort than the rows themselves.
+        In case of a hash collision, the rows are compared in full.
+
+        @param array The array whose rows (along the first dimension) are
+        searched.
+
+        @return The unique rows, and the index of the unique row of every row
+        of 'array'.
+        """
+        row = array.reshape(len(array), -1)
+        weight = numpy.random.RandomState(0).uniform(1., 2., row.shape[1])
+        key, i_first, i_unique = numpy.unique(row.dot(weight),
+                                              return_index = True,
+                                              return_inverse = True)
+        unique = array[i_first]
+        if not (unique.reshape(len(unique), -1)[i_unique] == row).all():
+            unique, i_unique = numpy.unique(row, axis = 0,
+                                            return_inverse = True)
+            unique = unique.reshape((len(unique),) + array.shape[1:])
+        return unique, i_unique
+
+
+    def ParallelLinkEmission(self, pollutant, speed, length, flow, fleet,
+                             copert_class = None, engine_capacity = None,
+                             Nprocess = None, chunk_size = 100000,
+                             output = None):
+        """Computes the hot emissions of passenger cars on every link of a
+        network, like LinkEmission, with the links split into chunks that are
+        processed by a pool of worker processes.
+
+        The workers are forked after the input arrays and this instance (with
+        its coefficients loaded) are stored in a module-level variable, so
+        that they inherit them without copy. Only the emissions of each chunk
+        are sent back to the parent process, which writes them in the output
+        array, at the positions of the chunk's links, as soon as they arrive.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*, or a list of them.
+
+        @param speed The average velocity on each link in kilometers per
+        hour, with shape (N,).
+
+        @param length The length of each link in kilometers, with shape (N,).
+
+        @param flow The vehicle flow on each link, with shape (N,), e.g. in
+        veh/h.
+
+        @param fleet The proportion of the flow in each vehicle category,
+        with shape (N, 2, Nclass, Ncapacity). See LinkEmission.
+
+        @param copert_class The list of the COPERT classes of the third
+        dimension of 'fleet'. See LinkEmission.
+
+        @param engine_capacity The list of the engine capacities of the last
+        dimension of 'fleet'. See LinkEmission.
+
+        @param Nprocess The number of worker processes. By default, it is the
+        number of CPUs. With 1, the chunks are computed in this process.
+
+        @param chunk_size The number of links in a chunk.
+
+        @param output An array with shape (N,), or (Npollutant, N) for a
+        list of pollutants, where the emissions are written, e.g. a
+        memory-mapped array. By default, a new array is allocated.
+
+        @return The emissions on each link in g (per time unit of the flow),
+        with shape (N,) or (Npollutant, N), and the list of the chunks as
+        tuples (first link, last link + 1, computation time in seconds).
+        """
+        if chunk_size < 1:
+            raise Exception, "The chunk size must be at least 1."
+        if Nprocess is None:
+            Nprocess = multiprocessing.cpu_count()
+        speed = numpy.asarray(speed, dtype = float)
+        length = numpy.asarray(length, dtype = float)
+        flow = numpy.asarray(flow, dtype = float)
+        fleet = numpy.asarray(fleet, dtype = float)
+        N = len(speed)
+        if isinstance(pollutant, (list, tuple, numpy.ndarray)):
+            shape = (len(pollutant), N)
+        else:
+            shape = (N,)
+        if output is None:
+            output = numpy.empty(shape, dtype = float)
+        elif output.shape != shape:
+            raise Exception, "The output array must have shape " \
+                + str(shape) + "."
+        chunk = [(start, min(start + chunk_size, N))
+                 for start in range(0, N, chunk_size)]
+        # Loads the coefficients once, before the workers are forked.
+        self.pc_parameter
+
+        global _parallel_link_data
+        _parallel_link_data = (self, pollutant, speed, length, flow, fleet,
+                               copert_class, engine_capacity)
+        # The emissions of each chunk are written as soon as they arrive, so
+        # that the parent process never holds more than one chunk.
+        chunk_time = []
+        try:
+            if Nprocess == 1 or len(chunk) == 1:
+                pool = None
+                result = (_link_emission_chunk(c) for c in chunk)
+            else:
+                pool = multiprocessing.Pool(min(Nprocess, len(chunk)))
+                result = pool.imap_unordered(_link_emission_chunk, chunk)
+            try:
+                for start, end, emission, elapsed in result:
+                    output[..., start:end] = emission
+                    chunk_time.append((start, end, elapsed))
+                if pool is not None:
+                    pool.close()
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+        finally:
+            _parallel_link_data = None
+
+        chunk_time.sort()
+        return output, chunk_time
+
+
+    # Definition of Hot Emission Factor (HEF) for gasoline passenger cars.
+    def HEFGasolinePassengerCar(self, pollutant, speed, copert_class,
+                                engine_capacity, **kwargs):
+        """Computes the hot emissions factor in g/km for gasoline passenger
+        cars, except for fuel consumption-dependent emissions (SO2, Pb,
+        heavy metals).
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*.
+
+        @param speed The average velocity of the vehicles in kilometers per
+        hour.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes. They are introduced in the EMEP/EEA
+        emission inventory guidebook.
+
+        @param engine_capacity The engine capacity category, any of the
+        Copert.engine_capacity_* attributes. For pre-Euro classes, any other
+        value raises an exception.
+        """
+
+        if speed == 0.0:
+            return 0.0
+        else:
+            V = speed
             if copert_class <= self.class_Euro_4:
                 if V < 10. or V > 130. :
                     raise Exception, "There is no formula to calculate hot " \
@@ -854,262 +2054,42 @@ NAN     NAN      NAN        NAN        NAN
                         "10 km/h or higher than 130 km/h for passenger " \
                         "cars with emission standard lower than Euro 4."
                 else:
-                    if copert_class == self.class_PRE_ECE:
+                    if copert_class < self.class_Euro_1:
+                        if engine_capacity \
+                           not in self.engine_capacity_category:
+                            raise Exception, "The engine capacity must be " \
+                                "one of the Copert.engine_capacity_* " \
+                                "categories, not " + str(engine_capacity) \
+                                + ", for gasoline passenger cars with " \
+                                "emission standard of " \
+                                + self.name_class_euro[copert_class] + "."
                         if engine_capacity == self.engine_capacity_less_0p8:
                             raise Exception, "There is no formula to "\
                                 "calculate hot emission factor of gasoline " \
                                 "passenger cars when the engine capacity is "\
                                 "lower than 0.8 l with emission standard " \
-                                "of PRE ECE."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if V < 100.:
-                                    return self.power(281., -0.63, V)
-                                else:
-                                    return self.linear(0.112, 4.32, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if V < 100.:
-                                    return self.power(30.34, -0.693, V)
-                                else:
-                                    return self.constant(1.247)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(-0.00014, 0.0225,
-                                                          1.173, V)
-                                elif engine_capacity \
-                                == self.engine_capacity_1p4_to_2:
-                                    return self.quadratic(-0.00004, 0.0217,
-                                                          1.360, V)
-                                else:
-                                    return self.quadratic(0.0001, 0.03,
-                                                          1.5, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_ECE_15_00_or_01:
-                        if engine_capacity == self.engine_capacity_less_0p8:
-                            raise Exception, "There is no formula to "\
-                                "calculate hot emission factor of gasoline " \
-                                "passenger cars when the engine capacity " \
-                                "is lower than 0.8 l with emission standard "\
-                                "of ECE 15-00/01."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if V < 50.:
-                                    return self.power(313., -0.76, V)
-                                else:
-                                    return self.quadratic(0.0032, -0.406,
-                                                          27.22, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if V < 50.:
-                                    return self.power(24.99, -0.704, V)
-                                else:
-                                    return self.power(4.85, -0.318, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(-0.00014, 0.0225,
-                                                          1.173, V)
-                                elif engine_capacity \
-                                == self.engine_capacity_1p4_to_2:
-                                    return self.quadratic(-0.00004, 0.0217,
-                                                          1.360, V)
-                                else:
-                                    return self.quadratic(0.0001, 0.03,
-                                                          1.5, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_ECE_15_02:
-                        if engine_capacity == self.engine_capacity_less_0p8:
+                                "of " + self.name_class_euro[copert_class] \
+                                + "."
+                        if pollutant not in self.index_pollutant_pre_euro:
+                            raise Exception, "Only formulas for CO, " \
+                                "VOC, NOx are available for emission " \
+                                "standard of pre-Euro."
+                        i_pollutant = self.index_pollutant_pre_euro[pollutant]
+                        V_break = self.pre_euro_gasoline_speed_break\
+                                  [copert_class, i_pollutant]
+                        a, b, c, N \
+                            = self.pre_euro_gasoline_parameter\
+                            [copert_class, i_pollutant,
+                             int(engine_capacity), int(V >= V_break)]
+                        if math.isnan(N):
                             raise Exception, "There is no formula to "\
                                 "calculate hot emission factor of gasoline " \
                                 "passenger cars when the engine capacity " \
-                                "is lower than 0.8 l with emission standard "\
-                                "of ECE 15-02."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if V < 60.:
-                                    return self.power(300, -0.797, V)
-                                else:
-                                    return self.quadratic(0.0026, -0.44,
-                                                          26.26, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if V < 60.:
-                                    return self.power(25.75, -0.714, V)
-                                else:
-                                    return self.quadratic(0.00009, -0.019,
-                                                          1.95, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.00018, -0.0037,
-                                                          1.479, V)
-                                elif engine_capacity \
-                                == self.engine_capacity_1p4_to_2:
-                                    return self.quadratic(0.0002, -0.0038,
-                                                          1.663, V)
-                                else:
-                                    return self.quadratic(0.00022, -0.0039,
-                                                          1.87, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_ECE_15_03:
-                        if engine_capacity == self.engine_capacity_less_0p8:
-                             raise Exception, "There is no formula to "\
-                                 "calculate hot emission factor of gasoline " \
-                                 "passenger cars when the engine capacity " \
-                                 "is lower than 0.8 l with emission standard "\
-                                 "of ECE 15-03."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if V < 20.:
-                                    return self.logarithm(161.36, -45.62, V)
-                                else:
-                                    return self.quadratic(0.00377, -0.68,
-                                                          37.92, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if V < 60.:
-                                    return self.power(25.75, -0.714, V)
-                                else:
-                                    return self.quadratic(0.00009, -0.019,
-                                                          1.95, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.00025, -0.0084,
-                                                          1.616, V)
-                                elif engine_capacity \
-                                == self.engine_capacity_1p4_to_2:
-                                    return self.exponential(1.29, 0.0099, V)
-                                else:
-                                    return self.quadratic(0.000294, -0.0112,
-                                                          2.784, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_ECE_15_04:
-                        if engine_capacity == self.engine_capacity_less_0p8:
-                            raise Exception, "There is no formula to "\
-                                "calculate hot emission factor of gasoline " \
-                                "passenger cars when the engine capacity " \
-                                "is lower than 0.8 l with emission standard "\
-                                "of ECE 15-04."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if V < 60.:
-                                    return self.power(260.788, -0.91, V)
-                                else:
-                                    return self.quadratic(0.001163, -0.22,
-                                                          14.653, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if V < 60.:
-                                    return self.power(19.079, -0.693, V)
-                                else:
-                                    return self.quadratic(0.000179, -0.037,
-                                                          2.608, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.000097, 0.003,
-                                                          1.432, V)
-                                elif engine_capacity \
-                                == engine_capacity_1p4_to_2:
-                                    return self.quadratic(0.000074, 0.013,
-                                                          1.484, V)
-                                else:
-                                    return self.quadratic(0.000266, -0.014,
-                                                          2.427, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_Improved_Conventional:
-                        if engine_capacity == self.engine_capacity_less_0p8 \
-                           or engine_capacity == self.engine_capacity_more_2:
-                            raise Exception, "There is no formula to " \
-                                "calculate hot emission factor of gasoline " \
-                                "passenger cars when the engine capacity " \
-                                "is lower than 0.8 l or higher than 2.0 l " \
-                                "for vehicle technology of Improved " \
-                                "Conventional cars."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.002478, -0.294,
-                                                          14.577, V)
-                                else:
-                                    return self.quadratic(0.000957, -0.151,
-                                                          8.273, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.000201, -0.034,
-                                                          2.189, V)
-                                else:
-                                    return self.quadratic(0.000214, -0.034,
-                                                          1.999, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.logarithm(-0.926, 0.719, V)
-                                else:
-                                    return self.quadratic(0.000247, 0.0014,
-                                                          1.387, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "emission standard of pre-Euro."
-                                return None
-                    elif copert_class == self.class_Open_loop:
-                        if engine_capacity == self.engine_capacity_less_0p8 \
-                           or engine_capacity == self.engine_capacity_more_2:
-                            raise Exception, "There is no formula to "\
-                                "calculate hot emission factor of gasoline " \
-                                "passenger cars when the engine capacity " \
-                                "is lower than 0.8 l or higher than 2.0 l " \
-                                "for vehicle technology Open loop."
-                        else:
-                            if pollutant == self.pollutant_CO:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.002825, -0.377,
-                                                          17.882, V)
-                                else:
-                                    return self.quadratic(0.002029, -0.230,
-                                                          9.446, V)
-                            elif pollutant == self.pollutant_VOC:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.quadratic(0.000256, -0.0423,
-                                                          2.185, V)
-                                else:
-                                    return self.quadratic(0.000099, -0.016,
-                                                          0.808, V)
-                            elif pollutant == self.pollutant_NOx:
-                                if engine_capacity \
-                                   == self.engine_capacity_0p8_to_1p4:
-                                    return self.logarithm(-0.921, 0.616, V)
-                                else:
-                                    return self.logarithm(-0.761, 0.515, V)
-                            else:
-                                raise Exception, "Only formulas for CO, " \
-                                    "VOC, NOx are available for emission " \
-                                    "emission standard of pre-Euro."
-                                return None
-
+                                "is higher than 2.0 l with emission " \
+                                "standard of " \
+                                + self.name_class_euro[copert_class] + "."
+                        return self.list_pre_euro_function[int(N)](self, a, b,
+                                                                   c, V)
                     else:
                         if pollutant == self.pollutant_PM:
                             if copert_class <= self.class_Euro_2:
@@ -1145,7 +2125,9 @@ NAN     NAN      NAN        NAN        NAN
                                 = self.efc_gasoline_passenger_car[pollutant][copert_index]
                             return self.EF_25(a, b, c, d, e, f, V)
             else:
-                i_engine = engine_capacity
+                # The first engine type of 'pc_parameter' is for engines
+                # below 0.8 l.
+                i_engine = engine_capacity + 1
                 i_copert_class = self.index_copert_class_pc[copert_class]
                 if pollutant == self.pollutant_VOC \
                    or pollutant == self.pollutant_FC:
@@ -1169,6 +2151,601 @@ NAN     NAN      NAN        NAN        NAN
                 return emission_factor
 
 
+    # Definition of Hot Emission Factor (HEF) for gasoline passenger cars,
+    # for arrays of speeds.
+    def HEFGasolinePassengerCarArray(self, pollutant, speed, copert_class,
+                                     engine_capacity, return_status = False,
+                                     fill_value = numpy.nan,
+                                     speed_policy = "raise", **kwargs):
+        """Computes the hot emissions factors in g/km for gasoline passenger
+        cars, for an array of speeds. This is the vectorized version of
+        HEFGasolinePassengerCar, which returns the same values element-wise.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes, or an array of such classes that can be
+        broadcast against 'speed'.
+
+        @param engine_capacity The engine capacity, which can be any of the
+        Copert.engine_capacity_* attributes, or an array of such capacities
+        that can be broadcast against 'speed'.
+
+        @param return_status If True, no exception is raised for the inputs
+        without formula: their emission factors are set to 'fill_value',
+        and the status codes (Copert.status_*) are returned too, with the
+        shape of the emission factors. See Copert.StatusReport.
+
+        @param fill_value The emission factor of the invalid inputs when
+        'return_status' is True.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        a formula, with the own range of each formula: "raise" (no formula,
+        as in the scalar method), "clamp" (the emission factor at the
+        nearest bound of the range), "extrapolate" (linear extrapolation
+        from the nearest bound, with the slope of the formula over the last
+        km/h of the range, and clipped at zero) or "nan" (NaN). With any
+        policy but "raise", no exception is raised: the inputs that are
+        still without formula and the negative or undefined speeds get NaN
+        (or 'fill_value' if 'return_status' is True).
+
+        @return The array of hot emission factors in g/km, with the shape of
+        the broadcast inputs, and the array of the status codes if
+        'return_status' is True.
+        """
+        V, copert_class, engine_capacity \
+            = self._BroadcastArray(speed, copert_class, engine_capacity)
+        kernel = lambda V, c, k: \
+            self._HEFGasolinePassengerCarArray(pollutant, V, c, k)
+        speed_range = lambda c, k: self._SpeedRangePassengerCarArray(
+            self.engine_type_gasoline, pollutant, c, k)
+        return self._EvaluateArray(kernel, speed_range, V,
+                                   [copert_class, engine_capacity],
+                                   speed_policy, return_status, fill_value,
+                                   "gasoline passenger cars")
+
+
+    def _HEFGasolinePassengerCarArray(self, pollutant, V, copert_class,
+                                      engine_capacity):
+        """Computes the hot emission factors of gasoline passenger cars for
+        broadcast arrays. It returns the emission factors, and a Boolean
+        array which is True where there is no formula for the input.
+        """
+        emission_factor, invalid \
+            = self._HEFGasolinePassengerCarMultiArray([pollutant], V,
+                                                      copert_class,
+                                                      engine_capacity)
+        return emission_factor[0], invalid[0]
+
+
+    def HEFGasolinePassengerCarMultiArray(self, pollutant_list, speed,
+                                          copert_class, engine_capacity,
+                                          **kwargs):
+        """Computes the hot emissions factors in g/km for gasoline passenger
+        cars, for several pollutants and an array of speeds, in one
+        pass. The selection of the formulas and the parameter lookups are
+        shared by all pollutants.
+
+        @param pollutant_list The list of the pollutants for which the
+        emissions are computed, among Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes, or an array of such classes that can be
+        broadcast against 'speed'.
+
+        @param engine_capacity The engine capacity, which can be any of the
+        Copert.engine_capacity_* attributes, or an array of such capacities
+        that can be broadcast against 'speed'.
+
+        @return The array of hot emission factors in g/km, with shape
+        (Npollutant,) followed by the shape of the broadcast inputs.
+        """
+        V, copert_class, engine_capacity \
+            = self._BroadcastArray(speed, copert_class, engine_capacity)
+        emission_factor, invalid \
+            = self._HEFGasolinePassengerCarMultiArray(pollutant_list, V,
+                                                      copert_class,
+                                                      engine_capacity)
+        self._CheckArray(invalid, "gasoline passenger cars")
+        return emission_factor
+
+
+    def _HEFGasolinePassengerCarMultiArray(self, pollutant_list, V,
+                                           copert_class, engine_capacity):
+        """Computes the hot emission factors of gasoline passenger cars for a
+        list of pollutants and broadcast arrays. It returns the emission
+        factors, and a Boolean array which is True where there is no formula
+        for the input, both with shape (Npollutant,) + V.shape.
+        """
+        shape = (len(pollutant_list),) + V.shape
+        emission_factor = numpy.empty(shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        invalid = numpy.zeros(shape, dtype = bool)
+
+        stopped = V == 0.0
+        emission_factor[:, stopped] = 0.0
+
+        # Up to Euro 4.
+        old = ~stopped & (copert_class <= self.class_Euro_4)
+        out_of_range = old & ((V < 10.) | (V > 130.))
+        invalid[:, out_of_range] = True
+        old &= ~out_of_range
+
+        ## Pre-Euro.
+        pre_euro = old & (copert_class < self.class_Euro_1)
+        no_capacity \
+            = pre_euro & (engine_capacity == self.engine_capacity_less_0p8)
+        invalid[:, no_capacity] = True
+        pre_euro &= ~no_capacity
+        if pre_euro.any():
+            i_pre_euro_class = copert_class[pre_euro].astype(int)
+            i_pre_euro_capacity = engine_capacity[pre_euro].astype(int)
+            V_pre_euro = V[pre_euro]
+
+        ## Euro 1 to Euro 4.
+        euro = old & (copert_class >= self.class_Euro_1)
+        global_class_index = [self.class_Euro_1, self.class_Euro_2,
+                              self.class_Euro_3, self.class_Euro_4]
+        euro_selection = [euro & (copert_class == euro_class)
+                          for euro_class in global_class_index]
+        euro_GDI = euro & (copert_class == self.class_Euro_3_GDI)
+
+        # Euro 5 and later.
+        recent = ~stopped & (copert_class >= self.class_Euro_5)
+        recent_pollutant = [i for i, pollutant in enumerate(pollutant_list)
+                            if pollutant != self.pollutant_VOC
+                            and pollutant != self.pollutant_FC]
+
+        for i, pollutant in enumerate(pollutant_list):
+            ef = emission_factor[i]
+            inv = invalid[i]
+
+            if pollutant not in self.index_pollutant_pre_euro:
+                inv |= pre_euro
+            elif pre_euro.any():
+                i_pollutant = self.index_pollutant_pre_euro[pollutant]
+                i_segment = (V_pre_euro >= self.pre_euro_gasoline_speed_break\
+                             [i_pre_euro_class, i_pollutant]).astype(int)
+                parameter \
+                    = self.pre_euro_gasoline_parameter\
+                    [i_pre_euro_class, i_pollutant, i_pre_euro_capacity,
+                     i_segment]
+                ef[pre_euro], inv[pre_euro] \
+                    = self._PreEuroFunctionArray(parameter, V_pre_euro)
+
+            if pollutant == self.pollutant_PM:
+                urban = V[euro] <= self.speed_type_urban
+                rural = V[euro] <= self.speed_type_rural
+                c = copert_class[euro]
+                ef[euro] \
+                    = numpy.select([c <= self.class_Euro_2,
+                                    c == self.class_Euro_3_GDI],
+                                   [numpy.select([urban, rural],
+                                                 [3.22e-3, 1.84e-3], 1.90e-3),
+                                    numpy.select([urban, rural],
+                                                 [6.6e-3, 2.96e-3], 6.95e-3)],
+                                   numpy.select([urban, rural],
+                                                [1.28e-3, 8.36e-4], 1.19e-3))
+            elif pollutant < self.efc_gasoline_passenger_car.shape[0]:
+                inv |= euro_GDI
+                for copert_index, selection in enumerate(euro_selection):
+                    a, b, c, d, e, f \
+                        = self.efc_gasoline_passenger_car[pollutant]\
+                        [copert_index]
+                    ef[selection] = self.EF_25(a, b, c, d, e, f, V[selection])
+            else:
+                inv |= euro
+
+            if i not in recent_pollutant:
+                inv |= recent
+
+        if recent_pollutant and recent.any():
+            # The first engine type of 'pc_parameter' is for engines below
+            # 0.8 l, and the Euro 5+ classes are contiguous.
+            i_engine = engine_capacity[recent].astype(int) + 1
+            i_copert_class \
+                = copert_class[recent].astype(int) - self.class_Euro_5
+            ef, inv = self._HEFParameterMultiArray(
+                [pollutant_list[i] for i in recent_pollutant], i_engine,
+                i_copert_class, V[recent])
+            for j, i in enumerate(recent_pollutant):
+                emission_factor[i][recent] = ef[j]
+                invalid[i][recent] = inv[j]
+
+        return emission_factor, invalid
+
+
+    def _PreEuroFunctionArray(self, parameter, V):
+        """Computes hot emission factors of gasoline passenger cars of
+        pre-Euro classes, from rows of 'pre_euro_gasoline_parameter'.
+
+        @param parameter The array of parameter rows (a, b, c, N), with shape
+        (N, 4).
+
+        @param V The array of speeds, with shape (N,).
+
+        @return The emission factors, and a Boolean array which is True where
+        there is no formula.
+        """
+        a, b, c, N = parameter.T
+        emission_factor = numpy.empty(V.shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        invalid = numpy.isnan(N)
+        for n in numpy.unique(N[~invalid]):
+            s = N == n
+            emission_factor[s] \
+                = self.list_pre_euro_function[int(n)](self, a[s], b[s], c[s],
+                                                      V[s])
+        return emission_factor, invalid
+
+
+    def _EquationArray(self, parameter, equation, speed, Ncoefficient,
+                       equation_list):
+        """Evaluates a family of equations for batches of coefficients,
+        equations and speeds. The elements are grouped by equation, and each
+        group is evaluated at once with NumPy functions.
+
+        @param parameter The coefficients, with shape (..., Ncoefficient) or
+        more columns, which are ignored.
+
+        @param equation The indexes in 'equation_list', with shape (...). A
+        NaN or negative index means that there is no equation.
+
+        @param speed The speeds in km/h, with shape (...).
+
+        @param Ncoefficient The number of coefficients of the equations.
+
+        @param equation_list The list of the equations, which take the
+        instance, the 'Ncoefficient' coefficients and the speed.
+
+        @return The emission factors, with the broadcast shape of the
+        arguments, and NaN where there is no equation.
+        """
+        parameter = numpy.asarray(parameter, dtype = float)
+        equation = numpy.asarray(equation, dtype = float)
+        V = numpy.asarray(speed, dtype = float)
+        shape = numpy.broadcast(parameter[..., 0], equation, V).shape
+        coefficient = [numpy.broadcast_to(parameter[..., i], shape).ravel()
+                       for i in range(Ncoefficient)]
+        equation = numpy.broadcast_to(equation, shape).ravel()
+        V = numpy.broadcast_to(V, shape).ravel()
+
+        emission_factor = numpy.empty(V.shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        defined = equation[~numpy.isnan(equation)]
+        for n in numpy.unique(defined[defined >= 0]):
+            s = numpy.flatnonzero(equation == n)
+            argument = [x[s] for x in coefficient] + [V[s]]
+            emission_factor[s] = equation_list[int(n)](self, *argument)
+        return emission_factor.reshape(shape)
+
+
+    def EquationPCLDVArray(self, parameter, equation, speed):
+        """Evaluates the equations Eq_1 to Eq_17 of passenger cars and light
+        commercial vehicles for batches of coefficients, equations and
+        speeds. The elements are grouped by equation, and each group is
+        evaluated at once with NumPy functions.
+
+        @param parameter The coefficients (a, b, c, d, e, f, g, h, rf), with
+        shape (..., 9). Additional columns are ignored, so that rows of
+        'pc_parameter' or 'ldv_parameter' can be given directly.
+
+        @param equation The equation indexes, from 0 for Eq_1 to 16 for Eq_17
+        as in the last column of 'pc_parameter', with shape (...). A NaN or
+        negative index means that there is no equation.
+
+        @param speed The speeds in km/h, with shape (...).
+
+        @return The emission factors, with the broadcast shape of the
+        arguments, and NaN where there is no equation.
+        """
+        return self._EquationArray(parameter, equation, speed, 9,
+                                   self.list_equation_pc_ldv_array)
+
+
+    def _HEFParameterArray(self, parameter, V):
+        """Computes hot emission factors of passenger cars or light
+        commercial vehicles of emission standard Euro 5 or higher, from rows
+        of 'pc_parameter' or 'ldv_parameter'.
+
+        @param parameter The array of parameter rows (a, b, c, d, e, f, g, h,
+        rf, Vmin, Vmax, N_eq), with shape (N, 12).
+
+        @param V The array of speeds, with shape (N,).
+
+        @return The emission factors, and a Boolean array which is True where
+        the speed is out of the range of the formula or where there is no
+        formula.
+        """
+        Vmin, Vmax, N_eq = parameter[:, 9], parameter[:, 10], parameter[:, 11]
+        invalid = numpy.isnan(N_eq) | (V < Vmin) | (V > Vmax)
+        emission_factor \
+            = self.EquationPCLDVArray(parameter,
+                                      numpy.where(invalid, numpy.nan, N_eq),
+                                      V)
+        return emission_factor, invalid
+
+
+    def _HEFParameterMultiArray(self, pollutant_list, i_engine,
+                                i_copert_class, V):
+        """Computes hot emission factors of passenger cars of emission
+        standard Euro 5 or higher, for several pollutants, from
+        'pc_parameter'. All pollutants are evaluated together, so that the
+        elements are grouped by equation only once.
+
+        @param pollutant_list The list of the pollutants.
+
+        @param i_engine The array of the engine type indexes in
+        'pc_parameter', with shape (N,).
+
+        @param i_copert_class The array of the COPERT class indexes in
+        'pc_parameter', with shape (N,).
+
+        @param V The array of speeds, with shape (N,).
+
+        @return The emission factors, and a Boolean array which is True where
+        the speed is out of the range of the formula or where there is no
+        formula, both with shape (Npollutant, N).
+        """
+        i_pollutant = numpy.array([self.index_pollutant[pollutant]
+                                   for pollutant in pollutant_list])
+        parameter = self.pc_parameter[i_engine, i_copert_class][:, i_pollutant]
+        parameter = parameter.transpose(1, 0, 2).reshape(-1, 12)
+        emission_factor, invalid \
+            = self._HEFParameterArray(parameter,
+                                      numpy.tile(V, len(pollutant_list)))
+        shape = (len(pollutant_list), len(V))
+        return emission_factor.reshape(shape), invalid.reshape(shape)
+
+
+    def _BroadcastArray(self, speed, *args):
+        """Converts the speed into an array of floats, and broadcasts it
+        together with the other arguments (e.g., classes or capacities).
+        """
+        return numpy.broadcast_arrays(numpy.asarray(speed, dtype = float),
+                                      *[numpy.asarray(x) for x in args])
+
+
+    def _CheckArray(self, invalid, vehicle,
+                    quantity = "hot emission factors"):
+        """Raises an exception if any element is marked as invalid.
+        """
+        if invalid.any():
+            i_invalid = numpy.flatnonzero(invalid)
+            raise Exception, "There is no formula to calculate " + quantity \
+                + " for " + vehicle + " for " \
+                + str(len(i_invalid)) + " of the " + str(invalid.size) \
+                + " input elements (the first one is at flat index " \
+                + str(i_invalid[0]) + ")."
+
+
+    def _EvaluateArray(self, kernel, speed_range, V, argument, speed_policy,
+                       return_status, fill_value, vehicle,
+                       quantity = "hot emission factors"):
+        """Computes emission factors for arrays, and applies the speed
+        policy and the treatment of the invalid inputs of the *Array
+        methods.
+
+        @param kernel The function that returns the emission factors and
+        the Boolean array which is True where there is no formula, for the
+        speeds and the arrays 'argument'.
+
+        @param speed_range The function that returns the speed ranges (Vmin,
+        Vmax) of the formulas, with NaN where there is no formula, for
+        arrays like 'argument'.
+
+        @param V The array of speeds.
+
+        @param argument The list of the other input arrays, with the shape
+        of 'V'.
+
+        @param vehicle The name of the vehicles, for the error messages.
+
+        @param quantity The name of the emission factors, for the error
+        messages.
+
+        See the *Array methods for the other arguments.
+
+        @return The emission factors, and the status codes if
+        'return_status' is True.
+        """
+        if speed_policy not in self.name_speed_policy:
+            raise Exception, "Unknown speed policy \"" + str(speed_policy) \
+                + "\". It must be one of \"" \
+                + "\", \"".join(self.name_speed_policy) + "\"."
+        # The comparisons of undefined speeds (NaN) must not warn.
+        with numpy.errstate(invalid = "ignore"):
+            emission_factor, invalid = kernel(V, *argument)
+            if return_status:
+                status = self._StatusArray(V, invalid, speed_range,
+                                           *argument)
+            # The speed policy only applies to valid speeds. With "nan", the
+            # speeds out of range are simply left invalid.
+            selection = invalid & (V >= 0.)
+            if speed_policy in ("clamp", "extrapolate") \
+                    and selection.any():
+                value, fixed \
+                    = self._SpeedPolicyArray(kernel, speed_range,
+                                             V[selection],
+                                             [x[selection] for x in argument],
+                                             speed_policy)
+                emission_factor[selection] \
+                    = numpy.where(fixed, value, emission_factor[selection])
+                invalid[selection] = ~fixed
+            if return_status:
+                emission_factor[invalid | ~(V >= 0.)] = fill_value
+                return emission_factor, status
+            if speed_policy == "raise":
+                self._CheckArray(invalid, vehicle, quantity)
+            else:
+                emission_factor[invalid | ~(V >= 0.)] = numpy.nan
+            return emission_factor
+
+
+    def _SpeedPolicyArray(self, kernel, speed_range, V, argument,
+                          speed_policy):
+        """Computes the emission factors of the speeds out of the range of
+        their formula, according to the speed policy "clamp" or
+        "extrapolate".
+
+        @param kernel The function that computes the emission factors (see
+        Copert._EvaluateArray).
+
+        @param speed_range The function that returns the speed ranges of
+        the formulas (see Copert._EvaluateArray).
+
+        @param V The one-dimensional array of the speeds without formula.
+
+        @param argument The list of the other input arrays, with the shape
+        of 'V'.
+
+        @param speed_policy The speed policy: "clamp" or "extrapolate".
+
+        @return The emission factors, and a Boolean array which is True
+        where the speed was out of the range of a formula, that is, where
+        the emission factor was set by the policy.
+        """
+        emission_factor = numpy.empty(V.shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        fixed = numpy.zeros(V.shape, dtype = bool)
+        Vmin, Vmax = speed_range(*argument)
+        below = V < Vmin
+        i_out = numpy.flatnonzero(below | (V > Vmax))
+        if len(i_out) == 0:
+            return emission_factor, fixed
+
+        argument = [x[i_out] for x in argument]
+        below = below[i_out]
+        Vmin, Vmax = Vmin[i_out], Vmax[i_out]
+        bound = numpy.where(below, Vmin, Vmax)
+        # The formula must be defined at the bound.
+        ef_bound, invalid = kernel(bound, *argument)
+        fixed[i_out] = ~invalid
+        if speed_policy == "clamp":
+            emission_factor[i_out] = ef_bound
+        elif speed_policy == "extrapolate":
+            # Slope over the last km/h of the range (or over the whole range
+            # if it is narrower).
+            step = numpy.minimum(1., Vmax - Vmin)
+            step = numpy.where(below, step, -step)
+            ef_step, invalid_step = kernel(bound + step, *argument)
+            slope = (ef_step - ef_bound) \
+                / numpy.where(step == 0., 1., step)
+            slope[invalid_step | (step == 0.)] = 0.
+            emission_factor[i_out] \
+                = numpy.maximum(ef_bound + slope * (V[i_out] - bound), 0.)
+        return emission_factor, fixed
+
+
+    def _StatusArray(self, V, invalid, speed_range, *args):
+        """Computes the status codes (Copert.status_*) of emission factors
+        computed for arrays. The inputs without formula are split into the
+        speeds out of the range of the formula, and the categories (vehicle
+        and pollutant) for which there is no formula at all.
+
+        @param V The array of speeds.
+
+        @param invalid The Boolean array which is True where there is no
+        formula for the input, with the shape of 'V'.
+
+        @param speed_range The function that returns the speed ranges (Vmin,
+        Vmax) of the formulas, with NaN where there is no formula, for the
+        arrays 'args'.
+
+        @param args The other input arrays, with the shape of 'V'. Only
+        their invalid elements are given to 'speed_range'.
+
+        @return The array of the status codes, with the shape of 'V'.
+        """
+        status = numpy.zeros(V.shape, dtype = numpy.int8)
+        with numpy.errstate(invalid = "ignore"):
+            if invalid.any():
+                Vmin, Vmax = speed_range(*[x[invalid] for x in args])
+                v = V[invalid]
+                status[invalid] \
+                    = numpy.select([v < Vmin, v > Vmax],
+                                   [self.status_speed_below_range,
+                                    self.status_speed_above_range],
+                                   self.status_no_formula)
+            # Negative speeds, and NaN.
+            status[~(V >= 0.)] = self.status_invalid_speed
+        return status
+
+
+    def StatusReport(self, status):
+        """Returns a text report on status codes returned in batch mode by
+        the *Array methods (see their argument 'return_status'): the number
+        of elements for every status found.
+
+        @param status The array of status codes (Copert.status_*).
+        """
+        status = numpy.asarray(status)
+        count = numpy.bincount(status.ravel(),
+                               minlength = len(self.name_status))
+        report = "Status of " + str(status.size) + " elements:"
+        for i, name in enumerate(self.name_status):
+            if count[i] != 0 or i == self.status_valid:
+                report += "\n  " + name + ": " + str(count[i]) + " (" \
+                    + "%.2f" % (100. * count[i] / max(status.size, 1)) \
+                    + "%)"
+        return report
+
+
+    def _SpeedRangePassengerCarArray(self, engine_type, pollutant,
+                                     copert_class, engine_capacity):
+        """Returns the speed ranges of the hot emission factor formulas of
+        passenger cars.
+
+        @param engine_type Copert.engine_type_gasoline or
+        Copert.engine_type_diesel.
+
+        @param pollutant The pollutant, any of Copert.pollutant_*.
+
+        @param copert_class The array of the COPERT classes.
+
+        @param engine_capacity The array of the engine capacities, with the
+        shape of 'copert_class'.
+
+        @return The arrays of the minimum and maximum speeds, with NaN where
+        there is no formula in 'pc_parameter'.
+        """
+        Vmin = numpy.empty(copert_class.shape, dtype = float)
+        Vmin.fill(10.)
+        Vmax = numpy.empty(copert_class.shape, dtype = float)
+        Vmax.fill(130.)
+        recent = copert_class >= self.class_Euro_5
+        if not recent.any():
+            return Vmin, Vmax
+        i_pollutant = self.index_pollutant.get(pollutant)
+        if i_pollutant is None or i_pollutant >= self.pc_parameter.shape[2]:
+            Vmin[recent], Vmax[recent] = numpy.nan, numpy.nan
+            return Vmin, Vmax
+        engine_capacity = engine_capacity[recent]
+        if engine_type == self.engine_type_gasoline:
+            i_engine = engine_capacity.astype(int) + 1
+        else:
+            i_engine = numpy.select([engine_capacity
+                                     == self.engine_capacity_0p8_to_1p4,
+                                     engine_capacity
+                                     == self.engine_capacity_1p4_to_2],
+                                    [4, 5], 6)
+        i_copert_class = copert_class[recent].astype(int) - self.class_Euro_5
+        vmin, vmax = self.pc_parameter[i_engine, i_copert_class, i_pollutant,
+                                       9:11].T
+        if engine_type == self.engine_type_diesel:
+            # All diesel formulas are restricted to [10, 130].
+            vmin, vmax = numpy.maximum(vmin, 10.), numpy.minimum(vmax, 130.)
+        Vmin[recent], Vmax[recent] = vmin, vmax
+        return Vmin, Vmax
+
+
     # Definition of cold-start emission quotient (e_cold / e_hot).
     def ColdStartEmissionQuotient(self, vehicle_type, engine_type, pollutant,
                                   speed, copert_class, engine_capacity,
@@ -1445,6 +3022,244 @@ NAN     NAN      NAN        NAN        NAN
                 "calculate the beta-parameter for cold-start emissions."
 
 
+    def ColdStartEmissionQuotientArray(self, vehicle_type, engine_type,
+                                       pollutant, speed, copert_class,
+                                       engine_capacity, ambient_temperature,
+                                       **kwargs):
+        """Computes the cold-start emission quotient (e_cold / e_hot) for
+        arrays of inputs. This is the vectorized version of
+        ColdStartEmissionQuotient, which returns the same values
+        element-wise, except that light commercial vehicles of Euro 1 and
+        later always use the quotient of gasoline passenger cars above 2 l,
+        whatever their engine capacity.
+
+        @param pollutant The pollutant, which can be any of
+        Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param ambient_temperature The ambient temperature in Celsius
+        degrees, e.g. per link or per hour.
+
+        The vehicle types, engine types, classes, capacities and ambient
+        temperatures are scalars or arrays that can be broadcast against
+        'speed'.
+
+        @return The array of the cold-start emission quotients.
+        """
+        V, vehicle_type, engine_type, copert_class, engine_capacity, \
+            ambient_temperature \
+            = self._BroadcastArray(speed, vehicle_type, engine_type,
+                                   copert_class, engine_capacity,
+                                   ambient_temperature)
+        quotient, invalid \
+            = self._ColdStartEmissionQuotientArray(vehicle_type, engine_type,
+                                                   pollutant, V,
+                                                   copert_class,
+                                                   engine_capacity,
+                                                   ambient_temperature)
+        self._CheckArray(invalid, "passenger cars or light commercial "
+                         "vehicles", "the cold-start emission quotient")
+        return quotient
+
+
+    def _ColdStartEmissionQuotientArray(self, vehicle_type, engine_type,
+                                        pollutant, V, copert_class,
+                                        engine_capacity, ambient_temperature):
+        """Computes the cold-start emission quotients for broadcast
+        arrays. It returns the quotients, and a Boolean array which is True
+        where there is no formula for the input.
+        """
+        T = numpy.asarray(ambient_temperature, dtype = float)
+        quotient = numpy.empty(V.shape, dtype = float)
+        quotient.fill(numpy.nan)
+        invalid = numpy.ones(V.shape, dtype = bool)
+
+        light = (vehicle_type == self.vehicle_type_passenger_car) \
+            | (vehicle_type == self.vehicle_type_light_commercial_vehicle)
+        gasoline = light & (engine_type == self.engine_type_gasoline)
+        diesel = light & (engine_type == self.engine_type_diesel)
+        conventional = gasoline & (copert_class < self.class_Euro_1)
+        euro = gasoline & (copert_class >= self.class_Euro_1)
+
+        # The quotients linear in the ambient temperature, as (a, b) for a +
+        # b * ta, in [-10, 30] Celsius degrees, and 1 above 30 degrees.
+        linear_conventional = {self.pollutant_CO: (3.7, -0.09),
+                               self.pollutant_NOx: (1.14, -0.006),
+                               self.pollutant_VOC: (2.8, -0.06),
+                               self.pollutant_FC: (1.47, -0.009)}
+        linear_diesel = {self.pollutant_CO: (1.9, -0.03),
+                         self.pollutant_NOx: (1.3, -0.013),
+                         self.pollutant_VOC: (3.1, -0.09),
+                         self.pollutant_PM: (3.1, -0.1),
+                         self.pollutant_FC: (1.34, -0.008)}
+        linear_case = [(conventional, linear_conventional),
+                       (diesel, linear_diesel)]
+        if pollutant == self.pollutant_FC:
+            linear_case.append((euro, linear_conventional))
+        for selection, coefficient in linear_case:
+            warm = selection & (T > 30.)
+            quotient[warm] = 1.
+            invalid[warm] = False
+            if pollutant in coefficient:
+                a, b = coefficient[pollutant]
+                selection = selection & (T >= -10.) & (T <= 30.)
+                quotient[selection] = a + b * T[selection]
+                invalid[selection] = False
+
+        # Gasoline vehicles from Euro 1, with the coefficients of table
+        # 'cold_start_emission_quotient'. The light commercial vehicles use
+        # the coefficients of the passenger cars above 2 l.
+        index_pollutant = {self.pollutant_CO: 0,
+                           self.pollutant_NOx: 1,
+                           self.pollutant_VOC: 2}
+        if pollutant in index_pollutant:
+            capacity = numpy.where(vehicle_type
+                                   == self.vehicle_type_passenger_car,
+                                   engine_capacity,
+                                   self.engine_capacity_more_2)
+            selection = euro & (V >= 5.) & (V <= 45.) & (T >= -20.) \
+                & (capacity >= self.engine_capacity_0p8_to_1p4) \
+                & (capacity <= self.engine_capacity_more_2)
+            v = V[selection]
+            t = T[selection]
+            if pollutant == self.pollutant_NOx:
+                i_v_ta = (v > 25.).astype(int)
+            else:
+                i_v_ta = numpy.where(t <= 15., (v > 25.).astype(int), 2)
+            i_capacity = capacity[selection].astype(int) \
+                - self.engine_capacity_0p8_to_1p4
+            A, B, C = self.cold_start_emission_quotient \
+                [index_pollutant[pollutant], i_capacity, i_v_ta].T
+            quotient[selection] = self.cold_start_eq(A, B, C, t, v)
+            invalid[selection] = False
+
+        return quotient, invalid
+
+
+    def ColdStartMileagePercentageArray(self, vehicle_type, engine_type,
+                                        pollutant, copert_class,
+                                        engine_capacity, ambient_temperature,
+                                        avg_trip_length, **kwargs):
+        """Computes the cold mileage percentage (the "beta parameter") for
+        arrays of inputs. This is the vectorized version of
+        ColdStartMileagePercentage, which returns the same values
+        element-wise.
+
+        @param pollutant The pollutant, which can be any of
+        Copert.pollutant_*.
+
+        @param ambient_temperature The ambient temperature in Celsius
+        degrees, e.g. per link or per hour.
+
+        @param avg_trip_length The average trip length in kilometers.
+
+        The vehicle types, engine types, classes, capacities, ambient
+        temperatures and trip lengths are scalars or arrays that can be
+        broadcast together.
+
+        @return The array of the cold mileage percentages.
+        """
+        ambient_temperature, vehicle_type, engine_type, copert_class, \
+            engine_capacity, avg_trip_length \
+            = self._BroadcastArray(ambient_temperature, vehicle_type,
+                                   engine_type, copert_class,
+                                   engine_capacity, avg_trip_length)
+        beta, invalid \
+            = self._ColdStartMileagePercentageArray(vehicle_type,
+                                                    engine_type, pollutant,
+                                                    copert_class,
+                                                    engine_capacity,
+                                                    ambient_temperature,
+                                                    avg_trip_length)
+        self._CheckArray(invalid, "passenger cars or light commercial "
+                         "vehicles", "the cold mileage percentage")
+        return beta
+
+
+    def _ColdStartMileagePercentageArray(self, vehicle_type, engine_type,
+                                         pollutant, copert_class,
+                                         engine_capacity,
+                                         ambient_temperature,
+                                         avg_trip_length):
+        """Computes the cold mileage percentages for broadcast arrays. It
+        returns the percentages, and a Boolean array which is True where
+        there is no formula for the input.
+        """
+        T = numpy.asarray(ambient_temperature, dtype = float)
+        L = numpy.asarray(avg_trip_length, dtype = float)
+        beta = numpy.empty(T.shape, dtype = float)
+        beta.fill(numpy.nan)
+        invalid = numpy.ones(T.shape, dtype = bool)
+
+        passenger_car = vehicle_type == self.vehicle_type_passenger_car
+        light = passenger_car \
+            | (vehicle_type == self.vehicle_type_light_commercial_vehicle)
+        gasoline = light & (engine_type == self.engine_type_gasoline)
+        diesel = light & (engine_type == self.engine_type_diesel)
+        c = copert_class
+
+        # The beta parameter of gasoline Euro 1 vehicles, from which the
+        # others are derived.
+        beta_euro_1 = 0.6474 - 0.02545 * L - (0.00974 - 0.000385 * L) * T
+
+        # Gasoline vehicles, with the reduction factors of the Euro 2, Euro
+        # 3, and later classes up to Euro 4.
+        selection = gasoline & (c <= self.class_Euro_1)
+        beta[selection] = beta_euro_1[selection]
+        invalid[selection] = False
+        reduction = {self.pollutant_CO: (0.72, 0.62, 0.18),
+                     self.pollutant_NOx: (0.72, 0.32, 0.18),
+                     self.pollutant_VOC: (0.56, 0.32, 0.18)}
+        if pollutant in reduction:
+            euro_2, euro_3, other = reduction[pollutant]
+            factor = numpy.where(c == self.class_Euro_2, euro_2,
+                                 numpy.where(c == self.class_Euro_3, euro_3,
+                                             other))
+            selection = gasoline & (c > self.class_Euro_1) \
+                & (c <= self.class_Euro_4)
+            beta[selection] = beta_euro_1[selection] * factor[selection]
+            invalid[selection] = False
+
+        # Diesel passenger cars. Their beta parameter is also the basis of
+        # the one of diesel light commercial vehicles.
+        beta_diesel = numpy.where(c <= self.class_Euro_4, beta_euro_1,
+                                  numpy.nan)
+        if pollutant not in (self.pollutant_HC, self.pollutant_FC):
+            if pollutant == self.pollutant_NOx:
+                factor = numpy.where(c == self.class_Euro_5, 1. - (-0.23),
+                                     1. - 0.57)
+            elif pollutant == self.pollutant_PM:
+                factor = 1. - 0.95
+            else:
+                factor = 1.
+            selection = (c > self.class_Euro_4) & (c <= self.class_Euro_6)
+            beta_diesel = numpy.where(selection, factor * beta_euro_1,
+                                      beta_diesel)
+        selection = diesel & passenger_car & ~numpy.isnan(beta_diesel)
+        beta[selection] = beta_diesel[selection]
+        invalid[selection] = False
+
+        # Diesel light commercial vehicles.
+        selection = diesel & ~passenger_car & (c <= self.class_Euro_2)
+        beta[selection] = beta_diesel[selection]
+        invalid[selection] = False
+        reduction = {self.pollutant_CO: (0.18, 0.35),
+                     self.pollutant_NOx: (0.16, 0.32),
+                     self.pollutant_VOC: (0.38, 0.77),
+                     self.pollutant_PM: (0.33, 0.65)}
+        if pollutant in reduction:
+            euro_3, euro_4 = reduction[pollutant]
+            for copert_class_ldv, r in [(self.class_Euro_3, euro_3),
+                                        (self.class_Euro_4, euro_4)]:
+                selection = diesel & ~passenger_car & (c == copert_class_ldv)
+                beta[selection] = (1. - r) * beta_diesel[selection]
+                invalid[selection] = False
+
+        return beta, invalid
+
+
     # Definition of Hot Emission Factor (HEF) for diesel passenger cars.
     def HEFDieselPassengerCar(self, pollutant, speed, copert_class,
                               engine_capacity, **kwargs):
@@ -1554,6 +3369,219 @@ NAN     NAN      NAN        NAN        NAN
                     return emission_factor
 
 
+    # Definition of Hot Emission Factor (HEF) for diesel passenger cars, for
+    # arrays of speeds.
+    def HEFDieselPassengerCarArray(self, pollutant, speed, copert_class,
+                                   engine_capacity, return_status = False,
+                                   fill_value = numpy.nan,
+                                   speed_policy = "raise", **kwargs):
+        """Computes the hot emissions factors in g/km for diesel passenger
+        cars, for an array of speeds. This is the vectorized version of
+        HEFDieselPassengerCar, which returns the same values element-wise.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes, or an array of such classes that can be
+        broadcast against 'speed'.
+
+        @param engine_capacity The engine capacity, which can be any of the
+        Copert.engine_capacity_* attributes, or an array of such capacities
+        that can be broadcast against 'speed'.
+
+        @param return_status If True, no exception is raised for the inputs
+        without formula: their emission factors are set to 'fill_value',
+        and the status codes (Copert.status_*) are returned too, with the
+        shape of the emission factors. See Copert.StatusReport.
+
+        @param fill_value The emission factor of the invalid inputs when
+        'return_status' is True.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        a formula, with the own range of each formula: "raise" (no formula,
+        as in the scalar method), "clamp" (the emission factor at the
+        nearest bound of the range), "extrapolate" (linear extrapolation
+        from the nearest bound, with the slope of the formula over the last
+        km/h of the range, and clipped at zero) or "nan" (NaN). With any
+        policy but "raise", no exception is raised: the inputs that are
+        still without formula and the negative or undefined speeds get NaN
+        (or 'fill_value' if 'return_status' is True).
+
+        @return The array of hot emission factors in g/km, with the shape of
+        the broadcast inputs, and the array of the status codes if
+        'return_status' is True.
+        """
+        V, copert_class, engine_capacity \
+            = self._BroadcastArray(speed, copert_class, engine_capacity)
+        kernel = lambda V, c, k: \
+            self._HEFDieselPassengerCarArray(pollutant, V, c, k)
+        speed_range = lambda c, k: self._SpeedRangePassengerCarArray(
+            self.engine_type_diesel, pollutant, c, k)
+        return self._EvaluateArray(kernel, speed_range, V,
+                                   [copert_class, engine_capacity],
+                                   speed_policy, return_status, fill_value,
+                                   "diesel passenger cars")
+
+
+    def _HEFDieselPassengerCarArray(self, pollutant, V, copert_class,
+                                    engine_capacity):
+        """Computes the hot emission factors of diesel passenger cars for
+        broadcast arrays. It returns the emission factors, and a Boolean
+        array which is True where there is no formula for the input.
+        """
+        emission_factor, invalid \
+            = self._HEFDieselPassengerCarMultiArray([pollutant], V,
+                                                    copert_class,
+                                                    engine_capacity)
+        return emission_factor[0], invalid[0]
+
+
+    def HEFDieselPassengerCarMultiArray(self, pollutant_list, speed,
+                                        copert_class, engine_capacity,
+                                        **kwargs):
+        """Computes the hot emissions factors in g/km for diesel passenger
+        cars, for several pollutants and an array of speeds, in one
+        pass. The selection of the formulas and the parameter lookups are
+        shared by all pollutants.
+
+        @param pollutant_list The list of the pollutants for which the
+        emissions are computed, among Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes, or an array of such classes that can be
+        broadcast against 'speed'.
+
+        @param engine_capacity The engine capacity, which can be any of the
+        Copert.engine_capacity_* attributes, or an array of such capacities
+        that can be broadcast against 'speed'.
+
+        @return The array of hot emission factors in g/km, with shape
+        (Npollutant,) followed by the shape of the broadcast inputs.
+        """
+        V, copert_class, engine_capacity \
+            = self._BroadcastArray(speed, copert_class, engine_capacity)
+        emission_factor, invalid \
+            = self._HEFDieselPassengerCarMultiArray(pollutant_list, V,
+                                                    copert_class,
+                                                    engine_capacity)
+        self._CheckArray(invalid, "diesel passenger cars")
+        return emission_factor
+
+
+    def _HEFDieselPassengerCarMultiArray(self, pollutant_list, V,
+                                         copert_class, engine_capacity):
+        """Computes the hot emission factors of diesel passenger cars for a
+        list of pollutants and broadcast arrays. It returns the emission
+        factors, and a Boolean array which is True where there is no formula
+        for the input, both with shape (Npollutant,) + V.shape.
+        """
+        shape = (len(pollutant_list),) + V.shape
+        emission_factor = numpy.empty(shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        no_formula = (copert_class == self.class_Euro_3_GDI) \
+            | (V < 10.) | (V > 130.)
+        invalid = numpy.empty(shape, dtype = bool)
+        invalid[:] = no_formula
+
+        # Pre-Euro.
+        pre_euro = ~no_formula & (copert_class < self.class_Euro_1)
+        v_pre_euro = V[pre_euro]
+        small_pre_euro = engine_capacity[pre_euro] <= 2.0
+
+        # Euro 1 to Euro 4.
+        euro = ~no_formula & (copert_class >= self.class_Euro_1) \
+            & (copert_class <= self.class_Euro_4)
+        i_capacity \
+            = numpy.select([engine_capacity
+                            == self.engine_capacity_0p8_to_1p4,
+                            engine_capacity
+                            == self.engine_capacity_1p4_to_2],
+                           [self.engine_capacity_0p8_to_1p4,
+                            self.engine_capacity_1p4_to_2],
+                           self.engine_capacity_more_2)
+        global_class_index = [self.class_Euro_1, self.class_Euro_2,
+                              self.class_Euro_3, self.class_Euro_4]
+        euro_selection = [euro & (copert_class == euro_class)
+                          for euro_class in global_class_index]
+        small_engine = engine_capacity == self.engine_capacity_0p8_to_1p4
+
+        # Euro 5 and later.
+        recent = ~no_formula & (copert_class >= self.class_Euro_5)
+        recent_pollutant = [i for i, pollutant in enumerate(pollutant_list)
+                            if pollutant != self.pollutant_VOC
+                            and pollutant != self.pollutant_FC]
+
+        for i, pollutant in enumerate(pollutant_list):
+            ef = emission_factor[i]
+            inv = invalid[i]
+
+            v = v_pre_euro
+            if pollutant == self.pollutant_CO:
+                ef[pre_euro] = self.power(5.41301, -0.574, v)
+            elif pollutant == self.pollutant_NOx:
+                ef[pre_euro] \
+                    = numpy.where(small_pre_euro,
+                                  self.quadratic(0.000101, -0.014, 0.918, v),
+                                  self.quadratic(0.000133, -0.018, 1.331, v))
+            elif pollutant == self.pollutant_VOC:
+                ef[pre_euro] = self.power(4.61, -0.937, v)
+            elif pollutant == self.pollutant_PM:
+                ef[pre_euro] = self.quadratic(0.000058, -0.0086, 0.45, v)
+            elif pollutant == self.pollutant_FC:
+                ef[pre_euro] = self.quadratic(0.014, -2.084, 118.489, v)
+            else:
+                inv |= pre_euro
+
+            if pollutant >= self.efc_diesel_passenger_car.shape[0]:
+                inv |= euro
+            else:
+                for copert_index, euro_class in enumerate(global_class_index):
+                    selection = euro_selection[copert_index]
+                    v = V[selection]
+                    a, b, c, d, e, f \
+                        = self.efc_diesel_passenger_car[pollutant]\
+                        [copert_index][i_capacity[selection]].T
+                    if euro_class <= self.class_Euro_3:
+                        inv[selection] \
+                            = numpy.isnan(a) & small_engine[selection]
+                    if pollutant == self.pollutant_CO \
+                       and euro_class == self.class_Euro_4:
+                        ef[selection] = 17.5e-3 + 86.42 \
+                            * (1 + numpy.exp(-(v + 117.67) / (-21.99)))**(-1)
+                    else:
+                        ef[selection] = self.EF_30(a, b, c, d, e, f, v)
+                ef[inv] = numpy.nan
+
+            if i not in recent_pollutant:
+                inv |= recent
+
+        if recent_pollutant and recent.any():
+            # The diesel engine types of 'pc_parameter' are numbered 4 to 6,
+            # and the Euro 5+ classes are contiguous.
+            i_engine = numpy.select([engine_capacity[recent]
+                                     == self.engine_capacity_0p8_to_1p4,
+                                     engine_capacity[recent]
+                                     == self.engine_capacity_1p4_to_2],
+                                    [4, 5], 6)
+            i_copert_class \
+                = copert_class[recent].astype(int) - self.class_Euro_5
+            ef, inv = self._HEFParameterMultiArray(
+                [pollutant_list[i] for i in recent_pollutant], i_engine,
+                i_copert_class, V[recent])
+            for j, i in enumerate(recent_pollutant):
+                emission_factor[i][recent] = ef[j]
+                invalid[i][recent] = inv[j]
+
+        return emission_factor, invalid
+
+
     # Definition of Hot Emission Factor (HEF) for light commercial vehicles.
     def HEFLightCommercialVehicle(self, pollutant, speed, engine_type,
                                   copert_class, **kwargs):
@@ -1641,18 +3669,210 @@ NAN     NAN      NAN        NAN        NAN
                 return emission_factor
 
 
+    # Definition of Hot Emission Factor (HEF) for light commercial vehicles,
+    # for arrays of speeds.
+    def HEFLightCommercialVehicleArray(self, pollutant, speed, engine_type,
+                                       copert_class, return_status = False,
+                                       fill_value = numpy.nan,
+                                       speed_policy = "raise", **kwargs):
+        """Computes the hot emissions factors in g/km for light commercial
+        vehicles, for an array of speeds. This is the vectorized version of
+        HEFLightCommercialVehicle, which returns the same values
+        element-wise.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param engine_type The engine type, Copert.engine_type_gasoline or
+        Copert.engine_type_diesel, or an array of such types that can be
+        broadcast against 'speed'.
+
+        @param copert_class The vehicle class, which can be any of the
+        Copert.class_* attributes, or an array of such classes that can be
+        broadcast against 'speed'.
+
+        @param return_status If True, no exception is raised for the inputs
+        without formula: their emission factors are set to 'fill_value',
+        and the status codes (Copert.status_*) are returned too, with the
+        shape of the emission factors. See Copert.StatusReport.
+
+        @param fill_value The emission factor of the invalid inputs when
+        'return_status' is True.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        a formula, with the own range of each formula: "raise" (no formula,
+        as in the scalar method), "clamp" (the emission factor at the
+        nearest bound of the range), "extrapolate" (linear extrapolation
+        from the nearest bound, with the slope of the formula over the last
+        km/h of the range, and clipped at zero) or "nan" (NaN). With any
+        policy but "raise", no exception is raised: the inputs that are
+        still without formula and the negative or undefined speeds get NaN
+        (or 'fill_value' if 'return_status' is True).
+
+        @return The array of hot emission factors in g/km, with the shape of
+        the broadcast inputs, and the array of the status codes if
+        'return_status' is True.
+        """
+        V, engine_type, copert_class \
+            = self._BroadcastArray(speed, engine_type, copert_class)
+        kernel = lambda V, t, c: \
+            self._HEFLightCommercialVehicleArray(pollutant, V, t, c)
+        speed_range = lambda t, c: \
+            self._SpeedRangeLightCommercialVehicleArray(pollutant, t, c)
+        return self._EvaluateArray(kernel, speed_range, V,
+                                   [engine_type, copert_class],
+                                   speed_policy, return_status, fill_value,
+                                   "light commercial vehicles")
+
+
+    def _HEFLightCommercialVehicleArray(self, pollutant, V, engine_type,
+                                        copert_class):
+        """Computes the hot emission factors of light commercial vehicles for
+        broadcast arrays. It returns the emission factors, and a Boolean
+        array which is True where there is no formula for the input.
+        """
+        emission_factor = numpy.empty(V.shape, dtype = float)
+        emission_factor.fill(numpy.nan)
+        invalid = numpy.ones(V.shape, dtype = bool)
+
+        stopped = V == 0.0
+        emission_factor[stopped] = 0.0
+        invalid[stopped] = False
+        engine = ~stopped & ((engine_type == self.engine_type_gasoline)
+                             | (engine_type == self.engine_type_diesel))
+
+        # Conventional to Euro 4. The emission factors of Euro 2 to Euro 4
+        # are reductions of those of Euro 1.
+        index_pollutant_pre_euro_4 = {self.pollutant_CO: 0,
+                                      self.pollutant_NOx: 1,
+                                      self.pollutant_VOC: 2,
+                                      self.pollutant_PM: 3,
+                                      self.pollutant_FC: 4}
+        old = self._OldLightCommercialVehicle(pollutant, engine,
+                                              copert_class)
+        if old.any():
+            i_pollutant = index_pollutant_pre_euro_4[pollutant]
+            i_engine_type = engine_type[old].astype(int)
+            c = copert_class[old]
+            v = V[old]
+            Vmin, Vmax, a, b, c_quadratic \
+                = self.ldv_parameter_pre_euro_1[i_engine_type, i_pollutant,
+                                                (c >= self.class_Euro_1)
+                                                .astype(int)].T
+            inv = numpy.isnan(Vmin) | (v < Vmin) | (v > Vmax)
+            ef = self.quadratic(a, b, c_quadratic, v)
+            euro = c >= self.class_Euro_2
+            if euro.any():
+                i_copert_class = numpy.select([c[euro] == self.class_Euro_2,
+                                               c[euro] == self.class_Euro_3],
+                                              [0, 1], 2)
+                reduction_percentage = 0.01 \
+                    * self.ldv_reduction_percentage[i_engine_type[euro],
+                                                    i_copert_class,
+                                                    i_pollutant]
+                ef[euro] = ef[euro] * (1.0 - reduction_percentage)
+            ef[inv] = numpy.nan
+            emission_factor[old] = ef
+            invalid[old] = inv
+
+        # Euro 5 and later.
+        recent = engine & (copert_class >= self.class_Euro_5)
+        if pollutant in self.index_pollutant and recent.any():
+            parameter \
+                = self.ldv_parameter[engine_type[recent].astype(int),
+                                     copert_class[recent].astype(int)
+                                     - self.class_Euro_5,
+                                     self.index_pollutant[pollutant]]
+            emission_factor[recent], invalid[recent] \
+                = self._HEFParameterArray(parameter, V[recent])
+
+        return emission_factor, invalid
+
+
+    def _OldLightCommercialVehicle(self, pollutant, engine, copert_class):
+        """Selects the light commercial vehicles of classes Conventional to
+        Euro 4 whose emission factors are computed from
+        'ldv_parameter_pre_euro_1' for a given pollutant.
+
+        @param pollutant The pollutant, any of Copert.pollutant_*.
+
+        @param engine The Boolean array which is True for the gasoline and
+        diesel vehicles.
+
+        @param copert_class The array of the COPERT classes.
+
+        @return The Boolean array of the selected vehicles.
+        """
+        if pollutant == self.pollutant_HC:
+            return numpy.zeros(copert_class.shape, dtype = bool)
+        if pollutant == self.pollutant_FC:
+            # Only Conventional and Euro 1.
+            last_class = self.class_Euro_1
+        else:
+            last_class = self.class_Euro_4
+        return engine & (copert_class >= self.class_Improved_Conventional) \
+            & (copert_class <= last_class) \
+            & (copert_class != self.class_Open_loop) \
+            & (copert_class != self.class_Euro_3_GDI)
+
+
+    def _SpeedRangeLightCommercialVehicleArray(self, pollutant, engine_type,
+                                               copert_class):
+        """Returns the speed ranges of the hot emission factor formulas of
+        light commercial vehicles.
+
+        @param pollutant The pollutant, any of Copert.pollutant_*.
+
+        @param engine_type The array of the engine types.
+
+        @param copert_class The array of the COPERT classes, with the shape
+        of 'engine_type'.
+
+        @return The arrays of the minimum and maximum speeds, with NaN where
+        there is no formula.
+        """
+        Vmin = numpy.empty(copert_class.shape, dtype = float)
+        Vmin.fill(numpy.nan)
+        Vmax = Vmin.copy()
+        engine = (engine_type == self.engine_type_gasoline) \
+            | (engine_type == self.engine_type_diesel)
+        index_pollutant_pre_euro_4 = {self.pollutant_CO: 0,
+                                      self.pollutant_NOx: 1,
+                                      self.pollutant_VOC: 2,
+                                      self.pollutant_PM: 3,
+                                      self.pollutant_FC: 4}
+        old = self._OldLightCommercialVehicle(pollutant, engine,
+                                              copert_class)
+        if old.any():
+            Vmin[old], Vmax[old] \
+                = self.ldv_parameter_pre_euro_1 \
+                [engine_type[old].astype(int),
+                 index_pollutant_pre_euro_4[pollutant],
+                 (copert_class[old] >= self.class_Euro_1).astype(int), :2].T
+        recent = engine & (copert_class >= self.class_Euro_5)
+        if pollutant in self.index_pollutant and recent.any():
+            parameter \
+                = self.ldv_parameter[engine_type[recent].astype(int),
+                                     copert_class[recent].astype(int)
+                                     - self.class_Euro_5,
+                                     self.index_pollutant[pollutant]]
+            no_formula = numpy.isnan(parameter[:, 11])
+            Vmin[recent] = numpy.where(no_formula, numpy.nan,
+                                       parameter[:, 9])
+            Vmax[recent] = numpy.where(no_formula, numpy.nan,
+                                       parameter[:, 10])
+        return Vmin, Vmax
+
+
     # Definition of Hot Emission Factor (HEF) for heavy duty vehicles and
     # buses.
     def HEFHeavyDutyVehicle(self, speed, vehicle_category, hdv_type,
                             hdv_copert_class, pollutant,
                             load, slope, **kwargs):
         V = speed
-        name_hdv_type \
-            = self.corr_hdv_type.keys()[self.corr_hdv_type.values().index(hdv_type)]
-        name_slope \
-            = self.corr_slope.keys()[self.corr_slope.values().index(slope)]
-        name_load \
-            = self.corr_load.keys()[self.corr_load.values().index(load)]
         i_hdv_or_bus = self.index_vehicle_type[vehicle_category]
         i_hdv_type = hdv_type
         i_hdv_copert_class = hdv_copert_class
@@ -1668,8 +3888,9 @@ NAN     NAN      NAN        NAN        NAN
                     + "range of [" + str(round(Vmin, 1)) + ", " \
                     + str(round(Vmax, 1)) + "] when calculating hot " \
                     "emission factors for heavy duty vehicles of type " \
-                    + name_hdv_type + " when the charge is " + name_load \
-                    + "% and the slope is " + name_slope + "."
+                    + self.name_hdv_type[hdv_type] + " when the charge is " \
+                    + self.name_load[load] + "% and the slope is " \
+                    + self.name_slope[slope] + "."
             emission_factor = self.list_equation_hdv[int(N_eq)](self, a, b, c,
                                                                 d, e, f, g, V)
         else:
@@ -1678,6 +3899,168 @@ NAN     NAN      NAN        NAN        NAN
         return emission_factor
 
 
+    # Definition of Hot Emission Factor (HEF) for heavy duty vehicles and
+    # buses, for arrays of speeds and vehicle categories.
+    def HEFHeavyDutyVehicleArray(self, speed, vehicle_category, hdv_type,
+                                 hdv_copert_class, pollutant, load, slope,
+                                 return_status = False,
+                                 fill_value = numpy.nan,
+                                 speed_policy = "nan", **kwargs):
+        """Computes the hot emission factors in g/km for heavy duty vehicles
+        and buses, for arrays of speeds and of indexes into 'hdv_parameter'.
+        This is the vectorized version of HEFHeavyDutyVehicle. The elements
+        are grouped by equation, and each group is evaluated at once.
+
+        @param speed The average velocities of the vehicles in kilometers
+        per hour.
+
+        @param vehicle_category The vehicle categories,
+        Copert.vehicle_type_heavy_duty_vehicle or Copert.vehicle_type_bus.
+
+        @param hdv_type The vehicle types, any of Copert.hdv_type_* or
+        Copert.bus_type_*.
+
+        @param hdv_copert_class The vehicle classes, any of
+        Copert.class_hdv_*.
+
+        @param pollutant The pollutants, any of Copert.pollutant_* except
+        Copert.pollutant_VOC.
+
+        @param load The loads, any of Copert.hdv_load_*.
+
+        @param slope The road slopes, any of Copert.slope_*.
+
+        @param return_status If True, the status codes (Copert.status_*)
+        are returned too, and the emission factors of the invalid inputs are
+        set to 'fill_value'. See Copert.StatusReport.
+
+        @param fill_value The emission factor of the invalid inputs when
+        'return_status' is True.
+
+        All other arguments can be integers or arrays that can be broadcast
+        together.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        a formula, with the own range of each formula: "raise" (no formula,
+        with an exception, as in the scalar method), "clamp" (the emission
+        factor at the nearest bound of the range), "extrapolate" (linear
+        extrapolation from the nearest bound, with the slope of the formula
+        over the last km/h of the range, and clipped at zero) or "nan"
+        (NaN). With any policy but "raise", no exception is raised: the
+        inputs that are still without formula and the negative or undefined
+        speeds get NaN (or 'fill_value' if 'return_status' is True). Unlike
+        the other *Array methods, the default policy is "nan", so that the
+        invalid inputs are NaN without exception unless "raise" is
+        requested.
+
+        @return The array of hot emission factors, with NaN where there is
+        no formula or where the speed is out of the range of the formula
+        (with the default policy), and the array of the status codes if
+        'return_status' is True.
+        """
+        argument = self._BroadcastArray(speed, vehicle_category, hdv_type,
+                                        hdv_copert_class, pollutant, load,
+                                        slope)
+        return self._EvaluateArray(self._HEFHeavyDutyVehicleArray,
+                                   self._SpeedRangeHeavyDutyVehicleArray,
+                                   argument[0], argument[1:], speed_policy,
+                                   return_status, fill_value,
+                                   "heavy duty vehicles")
+
+
+    def _HEFHeavyDutyVehicleArray(self, speed, vehicle_category, hdv_type,
+                                  hdv_copert_class, pollutant, load, slope):
+        """Computes the hot emission factors of heavy duty vehicles and
+        buses for broadcast arrays. It returns the emission factors, and a
+        Boolean array which is True where there is no formula or where the
+        speed is out of range.
+        """
+        argument = self._BroadcastArray(speed, vehicle_category, hdv_type,
+                                        hdv_copert_class, pollutant, load,
+                                        slope)
+        shape = argument[0].shape
+        V = argument[0].ravel()
+        parameter = self._HDVParameterArray(*[x.ravel()
+                                              for x in argument[1:]])
+        Vmin, Vmax, N_eq = parameter[:, 7], parameter[:, 8], parameter[:, 9]
+        invalid = numpy.isnan(N_eq)
+        invalid[~invalid] |= (V[~invalid] < Vmin[~invalid]) \
+            | (V[~invalid] > Vmax[~invalid])
+        emission_factor \
+            = self.EquationHDVArray(parameter,
+                                    numpy.where(invalid, numpy.nan, N_eq), V)
+        return emission_factor.reshape(shape), invalid.reshape(shape)
+
+
+    def _HDVParameterArray(self, vehicle_category, hdv_type,
+                           hdv_copert_class, pollutant, load, slope):
+        """Returns the rows of 'hdv_parameter' for one-dimensional arrays of
+        vehicle categories, types, classes, pollutants, loads and slopes.
+
+        @return The rows (a, b, c, d, e, f, g, Vmin, Vmax, N_eq), with shape
+        (N, 10), and NaN where the vehicle category or the pollutant is not
+        available.
+        """
+        # Indexes of the vehicle category and of the pollutant in
+        # 'hdv_parameter', or -1 if they are not available.
+        index_pollutant \
+            = numpy.array([self.index_pollutant.get(p, -1)
+                           for p in range(len(self.name_pollutant))])
+        i_pollutant = index_pollutant[pollutant]
+        i_hdv_or_bus = vehicle_category - self.vehicle_type_heavy_duty_vehicle
+        available = (i_hdv_or_bus >= 0) & (i_hdv_or_bus <= 1) \
+            & (i_pollutant >= 0)
+
+        parameter = numpy.empty((len(vehicle_category), 10), dtype = float)
+        parameter.fill(numpy.nan)
+        parameter[available] \
+            = self.hdv_parameter[i_hdv_or_bus[available], hdv_type[available],
+                                 hdv_copert_class[available],
+                                 i_pollutant[available], load[available],
+                                 slope[available]]
+        return parameter
+
+
+    def _SpeedRangeHeavyDutyVehicleArray(self, vehicle_category, hdv_type,
+                                         hdv_copert_class, pollutant, load,
+                                         slope):
+        """Returns the speed ranges of the hot emission factor formulas of
+        heavy duty vehicles and buses, for one-dimensional arrays of
+        indexes into 'hdv_parameter'.
+
+        @return The arrays of the minimum and maximum speeds, with NaN where
+        there is no formula.
+        """
+        parameter = self._HDVParameterArray(vehicle_category, hdv_type,
+                                            hdv_copert_class, pollutant,
+                                            load, slope)
+        no_formula = numpy.isnan(parameter[:, 9])
+        parameter[no_formula, 7:9] = numpy.nan
+        return parameter[:, 7], parameter[:, 8]
+
+
+    def EquationHDVArray(self, parameter, equation, speed):
+        """Evaluates the equations Eq_hdv_0 to Eq_hdv_15 of heavy duty
+        vehicles and buses for batches of coefficients, equations and
+        speeds. The elements are grouped by equation, and each group is
+        evaluated at once with NumPy functions.
+
+        @param parameter The coefficients (a, b, c, d, e, f, g), with shape
+        (..., 7). Additional columns are ignored, so that cells of
+        'hdv_parameter' can be given directly.
+
+        @param equation The equation indexes, from 0 to 15, with shape
+        (...). A NaN or negative index means that there is no equation.
+
+        @param speed The speeds in km/h, with shape (...).
+
+        @return The emission factors, with the broadcast shape of the
+        arguments, and NaN where there is no equation.
+        """
+        return self._EquationArray(parameter, equation, speed, 7,
+                                   self.list_equation_hdv_array)
+
+
     # Definition of Emission Factor (EF) for mopeds. There is no distinction
     # between hot and cold-start emissions, and only the emission factors
     # under urban driving conditions are given.
@@ -1709,8 +4092,6 @@ NAN     NAN      NAN        NAN        NAN
                             self.class_Euro_3] \
             and pollutant != self.pollutant_VOC:
             i_engine_type = self.index_moto_engine_type[engine_type]
-            name_engine_type \
-                = self.corr_engine_type.keys()[self.corr_engine_type.values().index(engine_type)]
             i_pollutant = self.index_pollutant[pollutant]
             i_copert_class = self.index_copert_class_moto[copert_class]
             Vmin, Vmax, a5, a4, a3, a2, a1, a0 \
@@ -1721,10 +4102,853 @@ NAN     NAN      NAN        NAN        NAN
                     + "range of [" + str(round(Vmin, 1)) + ", " \
                     + str(round(Vmax, 1)) + "] when calculating " \
                     "emission factors for motorcycles when engine type is " \
-                    + name_engine_type + "."
+                    + self.name_moto_engine_type[i_engine_type] + "."
             else:
                 return self.Eq_56(a0, a1, a2, a3, a4, a5, V)
         else:
             raise Exception, "Only formulas for motorcycles with emission " \
                 "standard of Conventional, Euro 1 - Euro 3 are available, " \
                 "and there is no formula for the pollutant VOC."
+
+
+    # Definition of Emission Factor (EF) for motorcycles, for arrays of
+    # speeds.
+    def EFMotorcycleArray(self, pollutant, speed, engine_type, copert_class,
+                          return_status = False, fill_value = numpy.nan,
+                          speed_policy = "raise", **kwargs):
+        """Computes the emission factors in g/km for motorcycles, for an
+        array of speeds. This is the vectorized version of EFMotorcycle,
+        which returns the same values element-wise, except that the
+        categories missing from 'moto_parameter' have no formula (instead of
+        a NaN emission factor).
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_* except
+        Copert.pollutant_VOC.
+
+        @param speed The array of average velocities of the vehicles in
+        kilometers per hour.
+
+        @param engine_type The engine type, any of Copert.engine_type_moto_*,
+        or an array of such types that can be broadcast against 'speed'.
+
+        @param copert_class The vehicle class, from
+        Copert.class_Improved_Conventional to Copert.class_Euro_3, or an
+        array of such classes that can be broadcast against 'speed'.
+
+        @param return_status If True, no exception is raised for the inputs
+        without formula: their emission factors are set to 'fill_value',
+        and the status codes (Copert.status_*) are returned too, with the
+        shape of the emission factors. See Copert.StatusReport.
+
+        @param fill_value The emission factor of the invalid inputs when
+        'return_status' is True.
+
+        @param speed_policy The treatment of the speeds out of the range of
+        a formula, with the own range of each formula: "raise" (no formula,
+        as in the scalar method), "clamp" (the emission factor at the
+        nearest bound of the range), "extrapolate" (linear extrapolation
+        from the nearest bound, with the slope of the formula over the last
+        km/h of the range, and clipped at zero) or "nan" (NaN). With any
+        policy but "raise", no exception is raised: the inputs that are
+        still without formula and the negative or undefined speeds get NaN
+        (or 'fill_value' if 'return_status' is True).
+
+        @return The array of emission factors in g/km, with the shape of the
+        broadcast inputs, and the array of the status codes if
+        'return_status' is True.
+        """
+        V, engine_type, copert_class \
+            = self._BroadcastArray(speed, engine_type, copert_class)
+        kernel = lambda V, t, c: \
+            self._EFMotorcycleArray(pollutant, V, t, c)
+        speed_range = lambda t, c: \
+            self._MotorcycleParameterArray(pollutant, t, c)[:, :2].T
+        return self._EvaluateArray(kernel, speed_range, V,
+                                   [engine_type, copert_class],
+                                   speed_policy, return_status, fill_value,
+                                   "motorcycles", "emission factors")
+
+
+    def _EFMotorcycleArray(self, pollutant, V, engine_type, copert_class):
+        """Computes the emission factors of motorcycles for broadcast
+        arrays. It returns the emission factors, and a Boolean array which
+        is True where there is no formula for the input.
+        """
+        Vmin, Vmax, a5, a4, a3, a2, a1, a0 \
+            = self._MotorcycleParameterArray(pollutant, engine_type.ravel(),
+                                             copert_class.ravel()).T
+        v = V.ravel()
+        invalid = numpy.isnan(Vmin) | (v < Vmin) | (v > Vmax)
+        emission_factor = self.Eq_56(a0, a1, a2, a3, a4, a5, v)
+        emission_factor[invalid] = numpy.nan
+        return emission_factor.reshape(V.shape), invalid.reshape(V.shape)
+
+
+    def _MotorcycleParameterArray(self, pollutant, engine_type,
+                                  copert_class):
+        """Returns the rows of 'moto_parameter' for a pollutant and
+        one-dimensional arrays of engine types and classes.
+
+        @return The rows (Vmin, Vmax, a5, a4, a3, a2, a1, a0), with shape
+        (N, 8), and NaN where there is no formula.
+        """
+        parameter = numpy.empty((len(engine_type), 8), dtype = float)
+        parameter.fill(numpy.nan)
+        if pollutant not in self.index_pollutant:
+            return parameter
+        i_engine_type = numpy.empty(len(engine_type), dtype = int)
+        i_engine_type.fill(-1)
+        for t, i in self.index_moto_engine_type.items():
+            i_engine_type[engine_type == t] = i
+        i_copert_class = numpy.empty(len(copert_class), dtype = int)
+        i_copert_class.fill(-1)
+        for c, i in self.index_copert_class_moto.items():
+            i_copert_class[copert_class == c] = i
+        available = (i_engine_type >= 0) & (i_copert_class >= 0)
+        parameter[available] \
+            = self.moto_parameter[i_engine_type[available],
+                                  self.index_pollutant[pollutant],
+                                  i_copert_class[available]]
+        return parameter
+
+
+    # Cache of the scalar emission factor methods.
+    cached_method = ["Emission", "HEFGasolinePassengerCar",
+                     "HEFDieselPassengerCar", "HEFLightCommercialVehicle",
+                     "HEFHeavyDutyVehicle", "EFMoped", "EFMotorcycle"]
+
+
+    def EnableCache(self, max_size = 100000):
+        """Enables a cache of the results of the scalar methods listed in
+        'cached_method'. The results are stored for each tuple of arguments
+        (including the keyword arguments), and the least recently used ones
+        are discarded when there are more than 'max_size' of them. The
+        exceptions raised for invalid arguments are stored too, and raised
+        again for the same arguments. Calls with unhashable arguments (e.g.,
+        arrays) are not cached.
+
+        @param max_size The maximum number of stored results.
+        """
+        if max_size < 1:
+            raise Exception, "The maximum size of the cache must be at " \
+                "least 1."
+        # The cache maps the arguments to the links of a circular doubly
+        # linked list [previous, next, key, (result, is_exception)], ordered
+        # from the least recently used to the most recently used.
+        self.cache = {}
+        self.cache_root = []
+        self.cache_root[:] = [self.cache_root, self.cache_root, None, None]
+        self.cache_max_size = max_size
+        self.cache_hit = 0
+        self.cache_miss = 0
+        self.cache_depth = 0
+        for name in self.cached_method:
+            setattr(self, name, self._CachedMethod(name))
+
+
+    def DisableCache(self):
+        """Disables the cache and discards its content.
+        """
+        for name in self.cached_method:
+            if name in self.__dict__:
+                delattr(self, name)
+        self.cache = None
+
+
+    def ClearCache(self):
+        """Discards the content of the cache and resets its counters.
+        """
+        if self.cache is not None:
+            self.cache.clear()
+            self.cache_root[:] = [self.cache_root, self.cache_root, None,
+                                  None]
+        self.cache_hit = 0
+        self.cache_miss = 0
+
+
+    def CacheInfo(self):
+        """Returns the number of hits and misses of the cache, its current
+        size and its maximum size, in a dictionary. Only the outermost calls
+        are counted: when a cached method calls another cached method (e.g.,
+        Emission calls HEFGasolinePassengerCar), the inner call uses the
+        cache but is not counted.
+        """
+        return {"hit": self.cache_hit, "miss": self.cache_miss,
+                "size": 0 if self.cache is None else len(self.cache),
+                "max_size": self.cache_max_size}
+
+
+    def _CachedMethod(self, name):
+        """Returns a version of the method 'name' that uses the cache.
+        """
+        method = getattr(Copert, name)
+        def cached(*args, **kwargs):
+            if kwargs:
+                key = (name, args, tuple(sorted(kwargs.items())))
+            else:
+                key = (name, args)
+            cache = self.cache
+            root = self.cache_root
+            try:
+                link = cache.get(key)
+            except TypeError:
+                # Unhashable arguments.
+                return method(self, *args, **kwargs)
+            outermost = self.cache_depth == 0
+            if link is not None:
+                if outermost:
+                    self.cache_hit += 1
+                # Moves the link to the most recently used position.
+                link_previous, link_next, key, entry = link
+                link_previous[1] = link_next
+                link_next[0] = link_previous
+                last = root[0]
+                last[1] = root[0] = link
+                link[0] = last
+                link[1] = root
+            else:
+                if outermost:
+                    self.cache_miss += 1
+                self.cache_depth += 1
+                try:
+                    entry = (method(self, *args, **kwargs), False)
+                except Exception as e:
+                    entry = (e, True)
+                finally:
+                    self.cache_depth -= 1
+                if len(cache) >= self.cache_max_size:
+                    # Discards the least recently used result.
+                    oldest = root[1]
+                    root[1] = oldest[1]
+                    oldest[1][0] = root
+                    del cache[oldest[2]]
+                last = root[0]
+                last[1] = root[0] = cache[key] = [last, root, key, entry]
+            if entry[1]:
+                raise entry[0]
+            return entry[0]
+        return cached
+
+
+    # Tabulation of the hot emission factors on a regular speed grid.
+    def BuildEmissionFactorTable(self, speed_min = 0., speed_max = None,
+                                 speed_step = 0.1, vehicle_type = None):
+        """Computes the hot emission factors of all vehicle categories on a
+        regular speed grid, so that they can later be interpolated with
+        EmissionFactorTable.Interpolate. The table covers every combination
+        of vehicle type, engine type, copert class, engine capacity and
+        pollutant for which a formula exists for at least one speed of the
+        grid. The grid points where there is no formula hold NaN.
+
+        @param speed_min The first speed of the grid, in km/h.
+
+        @param speed_max The last speed of the grid, in km/h. By default, it
+        is the largest maximum speed of the formulas of the tabulated
+        categories (e.g., 140 km/h for some motorcycles).
+
+        @param speed_step The step of the grid, in km/h.
+
+        @param vehicle_type The list of vehicle types to be tabulated, among
+        Copert.vehicle_type_passenger_car,
+        Copert.vehicle_type_light_commercial_vehicle and
+        Copert.vehicle_type_motorcycle (default: all of them).
+
+        @return The EmissionFactorTable instance.
+        """
+        if vehicle_type is None:
+            vehicle_type = [self.vehicle_type_passenger_car,
+                            self.vehicle_type_light_commercial_vehicle,
+                            self.vehicle_type_motorcycle]
+        category_list = self._EmissionFactorCategory(vehicle_type)
+        if speed_max is None:
+            speed_max = max(self._EmissionFactorSpeedRange(category)[1]
+                            for category in category_list)
+        Nspeed = int(round((speed_max - speed_min) / speed_step)) + 1
+        speed = speed_min + speed_step * numpy.arange(Nspeed)
+
+        key = []
+        table = []
+        for category in category_list:
+            emission_factor = self._EmissionFactorArray(category, speed)
+            if not numpy.isnan(emission_factor).all():
+                key.append(category)
+                table.append(emission_factor)
+
+        return EmissionFactorTable(speed_min, speed_step,
+                                   numpy.array(key, dtype = int),
+                                   numpy.array(table, dtype = float))
+
+
+    def BuildFleetEmissionFactor(self, pollutant, fleet, copert_class = None,
+                                 engine_capacity = None, speed_min = 10.,
+                                 speed_max = 130., speed_step = 0.1):
+        """Computes the fleet-average hot emission factor of passenger cars
+        on a regular speed grid, so that it can later be interpolated with
+        FleetEmissionFactor.Interpolate. The fleet-average emission factor
+        is the emission factor of every vehicle category weighted by its
+        proportion in the fleet, as in LinkEmission.
+
+        @param pollutant The pollutant for which the emission factors are
+        computed. It can be any of Copert.pollutant_*.
+
+        @param fleet The proportion of each vehicle category in the fleet,
+        with shape (2, Nclass, Ncapacity), or (Nprofile, 2, Nclass,
+        Ncapacity) for several fleet profiles. See LinkEmission.
+
+        @param copert_class The list of the COPERT classes of the
+        second-to-last dimension of 'fleet'. See LinkEmission.
+
+        @param engine_capacity The list of the engine capacities of the last
+        dimension of 'fleet'. See LinkEmission.
+
+        @param speed_min The first speed of the grid, in km/h.
+
+        @param speed_max The last speed of the grid, in km/h.
+
+        @param speed_step The step of the grid, in km/h.
+
+        @return The FleetEmissionFactor instance.
+        """
+        if speed_max <= speed_min:
+            raise Exception, "The speed grid must have at least two points."
+        fleet = numpy.asarray(fleet, dtype = float)
+        if fleet.ndim == 3:
+            fleet = fleet[None]
+        Nprofile = len(fleet)
+        Nspeed = int(round((speed_max - speed_min) / speed_step)) + 1
+        speed = speed_min + speed_step * numpy.arange(Nspeed)
+        one = numpy.ones(Nprofile * Nspeed, dtype = float)
+        table = self.LinkEmission(pollutant, numpy.tile(speed, Nprofile),
+                                  one, one, numpy.repeat(fleet, Nspeed,
+                                                         axis = 0),
+                                  copert_class, engine_capacity,
+                                  deduplicate = False)
+        return FleetEmissionFactor(speed_min, speed_step,
+                                   table.reshape(Nprofile, Nspeed))
+
+
+    def EmissionFactorTableError(self, table, Nsub = 4, floor = 0.01):
+        """Computes the maximum absolute and relative errors of the
+        interpolation in a table, against the exact formulas. The exact and
+        interpolated values are compared at 'Nsub' - 1 speeds inside each
+        interval of the grid whose two ends hold a value. The relative error
+        is the absolute difference divided by the absolute exact value, or
+        by 'floor' times the largest absolute exact value of the row if it
+        is larger, so that the speeds where the emission factor is close to
+        zero do not dominate. The errors are the largest next to the break
+        speeds of the piecewise formulas, where the exact emission factor is
+        discontinuous.
+
+        @param table The EmissionFactorTable instance, as returned by
+        BuildEmissionFactorTable.
+
+        @param Nsub The number of sub-intervals of each grid interval.
+
+        @param floor The lower bound of the denominator of the relative
+        error, as a fraction of the largest absolute exact value of the row.
+
+        @return The maximum relative error of each row of the table, with
+        shape (Nrow,). It is also stored in 'table.max_relative_error', and
+        the maximum absolute error (in g/km) is stored in
+        'table.max_absolute_error'.
+        """
+        Nspeed = table.table.shape[1]
+        fraction = numpy.arange(1, Nsub, dtype = float) / Nsub
+        speed = table.speed_min + table.speed_step \
+            * (numpy.arange(Nspeed - 1)[:, None] + fraction).ravel()
+        error = numpy.zeros(len(table.key), dtype = float)
+        absolute_error = numpy.zeros(len(table.key), dtype = float)
+        for i, category in enumerate(table.key):
+            exact = self._EmissionFactorArray(tuple(category), speed)
+            interpolated = table.InterpolateRow(i, speed)
+            defined = ~numpy.isnan(exact) & ~numpy.isnan(interpolated)
+            if defined.any():
+                exact = exact[defined]
+                difference = numpy.abs(interpolated[defined] - exact)
+                absolute_error[i] = difference.max()
+                scale = numpy.maximum(numpy.abs(exact),
+                                      floor * numpy.abs(exact).max())
+                error[i] = (difference
+                            / numpy.where(scale == 0., 1., scale)).max()
+        table.max_relative_error = error
+        table.max_absolute_error = absolute_error
+        return error
+
+
+    def _EmissionFactorCategory(self, vehicle_type):
+        """Lists all combinations (vehicle type, engine type, copert class,
+        engine capacity, pollutant) that may have a formula, for the given
+        vehicle types.
+        """
+        category = []
+        pollutant = range(self.pollutant_CO, self.pollutant_VOC + 1)
+        if self.vehicle_type_passenger_car in vehicle_type:
+            for t in [self.engine_type_gasoline, self.engine_type_diesel]:
+                for c in range(self.class_PRE_ECE, self.class_Euro_6c + 1):
+                    for k in range(self.engine_capacity_less_0p8,
+                                   self.engine_capacity_more_2 + 1):
+                        for p in pollutant:
+                            category.append((self.vehicle_type_passenger_car,
+                                             t, c, k, p))
+        ldv = self.vehicle_type_light_commercial_vehicle
+        if ldv in vehicle_type:
+            for t in [self.engine_type_gasoline, self.engine_type_diesel]:
+                for c in range(self.class_Improved_Conventional,
+                               self.class_Euro_6c + 1):
+                    for p in pollutant:
+                        category.append((ldv, t, c,
+                                         self.engine_capacity_less_0p8, p))
+        if self.vehicle_type_motorcycle in vehicle_type:
+            for t in self.index_moto_engine_type:
+                for c in self.index_copert_class_moto:
+                    for p in pollutant:
+                        category.append((self.vehicle_type_motorcycle, t, c,
+                                         self.engine_capacity_less_0p8, p))
+        return category
+
+
+    def _EmissionFactorArray(self, category, speed):
+        """Computes the hot emission factors of a vehicle category for an
+        array of speeds, with NaN where there is no formula.
+
+        @param category The tuple (vehicle type, engine type, copert class,
+        engine capacity, pollutant).
+
+        @param speed The array of speeds.
+        """
+        vehicle_type, engine_type, copert_class, engine_capacity, pollutant \
+            = category
+        if vehicle_type == self.vehicle_type_passenger_car:
+            if engine_type == self.engine_type_gasoline:
+                hef = self._HEFGasolinePassengerCarArray
+            else:
+                hef = self._HEFDieselPassengerCarArray
+            argument = self._BroadcastArray(speed, copert_class,
+                                            engine_capacity)
+        elif vehicle_type == self.vehicle_type_light_commercial_vehicle:
+            hef = self._HEFLightCommercialVehicleArray
+            argument = self._BroadcastArray(speed, engine_type, copert_class)
+        else:
+            hef = self._EFMotorcycleArray
+            argument = self._BroadcastArray(speed, engine_type, copert_class)
+        emission_factor, invalid = hef(pollutant, *argument)
+        emission_factor[invalid] = numpy.nan
+        return emission_factor
+
+
+    def _EmissionFactorSpeedRange(self, category):
+        """Returns the speed range of the hot emission factor formula of a
+        vehicle category.
+
+        @param category The tuple (vehicle type, engine type, copert class,
+        engine capacity, pollutant).
+
+        @return The minimum and maximum speeds, or -inf and -inf if there is
+        no formula.
+        """
+        vehicle_type, engine_type, copert_class, engine_capacity, pollutant \
+            = category
+        if vehicle_type == self.vehicle_type_passenger_car:
+            Vmin, Vmax = self._SpeedRangePassengerCarArray(
+                engine_type, pollutant, numpy.array([copert_class]),
+                numpy.array([engine_capacity]))
+        elif vehicle_type == self.vehicle_type_light_commercial_vehicle:
+            Vmin, Vmax = self._SpeedRangeLightCommercialVehicleArray(
+                pollutant, numpy.array([engine_type]),
+                numpy.array([copert_class]))
+        else:
+            Vmin, Vmax = self._MotorcycleParameterArray(
+                pollutant, numpy.array([engine_type]),
+                numpy.array([copert_class]))[:, :2].T
+        if numpy.isnan(Vmax[0]):
+            return - numpy.inf, - numpy.inf
+        return Vmin[0], Vmax[0]
+
+
+class EmissionFactorTable:
+    """
+    This class holds hot emission factors tabulated on a regular speed grid,
+    and interpolates them linearly. It is built by
+    Copert.BuildEmissionFactorTable.
+    """
+
+
+    def __init__(self, speed_min, speed_step, key, table,
+                 max_relative_error = None, max_absolute_error = None):
+        """Constructor.
+
+        @param speed_min The first speed of the grid, in km/h.
+
+        @param speed_step The step of the grid, in km/h.
+
+        @param key The vehicle category of each row of the table, with shape
+        (Nrow, 5). A category is (vehicle type, engine type, copert class,
+        engine capacity, pollutant).
+
+        @param table The emission factors in g/km, with shape (Nrow,
+        Nspeed). It holds NaN at the speeds without formula.
+
+        @param max_relative_error The maximum relative error of each row, as
+        computed by Copert.EmissionFactorTableError, if available.
+
+        @param max_absolute_error The maximum absolute error of each row, in
+        g/km, as computed by Copert.EmissionFactorTableError, if available.
+        """
+        self.speed_min = float(speed_min)
+        self.speed_step = float(speed_step)
+        self.key = key
+        self.table = table
+        self.max_relative_error = max_relative_error
+        self.max_absolute_error = max_absolute_error
+
+        # Row index of each category, or -1 if it is not tabulated. The
+        # engine capacity starts at Copert.engine_capacity_less_0p8 = -1.
+        self.index = - numpy.ones((6, 13, 15, 4, 6), dtype = int)
+        vehicle_type, engine_type, copert_class, engine_capacity, pollutant \
+            = key.T
+        self.index[vehicle_type, engine_type, copert_class,
+                   engine_capacity + 1, pollutant] = numpy.arange(len(key))
+        # Only the passenger cars depend on the engine capacity.
+        other = vehicle_type != Copert.vehicle_type_passenger_car
+        for k in range(1, 4):
+            self.index[vehicle_type[other], engine_type[other],
+                       copert_class[other], k, pollutant[other]] \
+                = numpy.arange(len(key))[other]
+
+
+    def Row(self, vehicle_type, engine_type, copert_class, engine_capacity,
+            pollutant):
+        """Returns the row indexes of vehicle categories, or -1 for the
+        categories that are not tabulated. The arguments can be integers or
+        arrays that can be broadcast together.
+        """
+        return self.index[vehicle_type, engine_type, copert_class,
+                          numpy.asarray(engine_capacity) + 1, pollutant]
+
+
+    def Interpolate(self, speed, vehicle_type, engine_type, copert_class,
+                    engine_capacity, pollutant):
+        """Interpolates the hot emission factors in g/km.
+
+        @param speed The speeds in km/h (scalar or array).
+
+        @param vehicle_type, engine_type, copert_class, engine_capacity,
+        pollutant The vehicle categories, as integers or arrays that can be
+        broadcast against 'speed'.
+
+        @return The interpolated emission factors, with NaN where there is
+        no formula.
+        """
+        return self.InterpolateRow(self.Row(vehicle_type, engine_type,
+                                            copert_class, engine_capacity,
+                                            pollutant), speed)
+
+
+    def InterpolateRow(self, row, speed):
+        """Interpolates the hot emission factors in g/km, for given rows of
+        the table.
+
+        @param row The row indexes, as returned by 'Row' (integer or array).
+
+        @param speed The speeds in km/h, broadcast against 'row'.
+
+        @return The interpolated emission factors, with NaN where there is
+        no formula.
+        """
+        row, speed = numpy.broadcast_arrays(numpy.asarray(row),
+                                            numpy.asarray(speed,
+                                                          dtype = float))
+        Nspeed = self.table.shape[1]
+        x = (speed - self.speed_min) / self.speed_step
+        with numpy.errstate(invalid = "ignore"):
+            tabulated = (row >= 0) & (x >= 0) & (x <= Nspeed - 1)
+        row = numpy.where(tabulated, row, 0)
+        emission_factor = _interpolate_grid(self.table, row, x)
+        return numpy.where(tabulated, emission_factor, numpy.nan)
+
+
+    def Save(self, filename):
+        """Saves the table in a NumPy binary file (.npz), which can be read
+        by 'load_emission_factor_table'.
+        """
+        error = {}
+        for name in ["max_relative_error", "max_absolute_error"]:
+            if getattr(self, name) is None:
+                error[name] = numpy.empty(0)
+            else:
+                error[name] = getattr(self, name)
+        numpy.savez(filename, speed = [self.speed_min, self.speed_step],
+                    key = self.key, table = self.table, **error)
+
+
+    def Report(self, Nworst = 10):
+        """Returns a text report on the maximum relative and absolute
+        errors, as computed by Copert.EmissionFactorTableError. The
+        categories are sorted by decreasing relative error.
+        """
+        if self.max_relative_error is None:
+            raise Exception, "The errors have not been computed. Call " \
+                "Copert.EmissionFactorTableError first."
+        order = numpy.argsort(self.max_relative_error)[::-1][:Nworst]
+        report = "Maximum relative error over " + str(len(self.key)) \
+            + " categories: " + "%.3e" % self.max_relative_error.max() \
+            + "\nMedian of the maximum relative errors: " \
+            + "%.3e" % numpy.median(self.max_relative_error)
+        if self.max_absolute_error is not None:
+            report += "\nMaximum absolute error: " \
+                + "%.3e" % self.max_absolute_error.max() + " g/km"
+        report += "\nLargest errors (vehicle type, engine type, copert " \
+            + "class, engine capacity, pollutant):"
+        for i in order:
+            report += "\n  " + str(tuple(self.key[i])) + ": " \
+                + "%.3e" % self.max_relative_error[i]
+            if self.max_absolute_error is not None:
+                report += " (" + "%.3e" % self.max_absolute_error[i] \
+                    + " g/km)"
+        return report
+
+
+class FleetEmissionFactor:
+    """
+    This class holds fleet-average hot emission factors tabulated on a
+    regular speed grid, for one or several fleet profiles, and interpolates
+    them linearly. It is built by Copert.BuildFleetEmissionFactor.
+    """
+
+
+    def __init__(self, speed_min, speed_step, table):
+        """Constructor.
+
+        @param speed_min The first speed of the grid, in km/h.
+
+        @param speed_step The step of the grid, in km/h.
+
+        @param table The fleet-average emission factors in g/km, with shape
+        (Nprofile, Nspeed).
+        """
+        self.speed_min = float(speed_min)
+        self.speed_step = float(speed_step)
+        self.table = table
+        # Python lists of the table, for the fast interpolation of scalars.
+        self.table_list = table.tolist()
+
+
+    def Interpolate(self, speed, profile = 0):
+        """Interpolates the fleet-average hot emission factors in g/km. The
+        speeds are clipped to the grid, like LinkEmission clips them to the
+        range of the formulas.
+
+        @param speed The speeds in km/h (scalar or array).
+
+        @param profile The index of the fleet profile, as an integer or an
+        array that can be broadcast against 'speed'.
+
+        @return The interpolated emission factors, with NaN where the speed
+        is NaN.
+        """
+        Nspeed = self.table.shape[1]
+        if isinstance(speed, (int, float)) and isinstance(profile, int):
+            if speed != speed:
+                return numpy.nan
+            x = min(max((speed - self.speed_min) / self.speed_step, 0.),
+                    Nspeed - 1.)
+            i = min(int(x), Nspeed - 2)
+            w = x - i
+            value = self.table_list[profile]
+            if w == 0.:
+                return value[i]
+            return (1. - w) * value[i] + w * value[i + 1]
+        profile, speed \
+            = numpy.broadcast_arrays(numpy.asarray(profile),
+                                     numpy.asarray(speed, dtype = float))
+        x = numpy.clip((speed - self.speed_min) / self.speed_step, 0.,
+                       Nspeed - 1.)
+        return _interpolate_grid(self.table, profile, x)
+
+
+class IncrementalLinkEmission:
+    """
+    This class keeps the hot emissions of passenger cars on every link of a
+    network (see Copert.LinkEmission), and updates them from new traffic
+    data. Only the links whose speed or fleet changed get their emission
+    factors recomputed; the links whose flow alone changed are rescaled.
+    """
+
+
+    def __init__(self, copert, pollutant, speed, length, flow, fleet,
+                 copert_class = None, engine_capacity = None):
+        """Constructor. It computes the emissions on all links.
+
+        @param copert The Copert instance.
+
+        @param pollutant The pollutant for which the emissions are
+        computed. It can be any of Copert.pollutant_*, or a list of them.
+
+        @param speed The average velocity on each link in kilometers per
+        hour, with shape (N,).
+
+        @param length The length of each link in kilometers, with shape (N,).
+
+        @param flow The vehicle flow on each link, with shape (N,).
+
+        @param fleet The proportion of the flow in each vehicle category,
+        with shape (N, 2, Nclass, Ncapacity). See Copert.LinkEmission.
+
+        @param copert_class The list of the COPERT classes of 'fleet'. See
+        Copert.LinkEmission.
+
+        @param engine_capacity The list of the engine capacities of
+        'fleet'. See Copert.LinkEmission.
+        """
+        self.copert = copert
+        self.pollutant = pollutant
+        self.fleet, self.copert_class, self.engine_capacity \
+            = copert._FleetArray(fleet, copert_class, engine_capacity)
+        self.fleet = self.fleet.copy()
+        self.speed = numpy.array(speed, dtype = float)
+        self.length = numpy.array(length, dtype = float)
+        self.flow = numpy.array(flow, dtype = float)
+        N = len(self.speed)
+        self.emission_factor = self._EmissionFactor(numpy.arange(N))
+        self.emission = self.emission_factor * self.flow * self.length
+        # Total emissions over the network, updated incrementally.
+        self.total = self.emission.sum(axis = -1)
+        # Number of links whose emission factors were recomputed, and whose
+        # emissions changed, at the last update.
+        self.Nrecomputed = N
+        self.Nupdated = N
+
+
+    def _EmissionFactor(self, link):
+        """Computes the fleet-weighted emission factors of given links.
+        """
+        one = numpy.ones(len(link), dtype = float)
+        return self.copert.LinkEmission(self.pollutant, self.speed[link], one,
+                                        one, self.fleet[link],
+                                        self.copert_class,
+                                        self.engine_capacity)
+
+
+    def Update(self, speed = None, flow = None, fleet = None, link = None):
+        """Updates the emissions from new traffic data, given either as a
+        full snapshot of the network or as a delta on some links. Missing
+        arguments are unchanged.
+
+        @param speed The new speeds, with shape (N,), or with shape (M,) if
+        'link' is given.
+
+        @param flow The new flows, with shape (N,) or (M,).
+
+        @param fleet The new fleet proportions, with shape (N, 2, Nclass,
+        Ncapacity) or (M, 2, Nclass, Ncapacity).
+
+        @param link The indexes of the M links of a delta, or None for a full
+        snapshot. A link may be listed several times: its last values are
+        used.
+
+        @return The number of links whose emission factors were recomputed.
+        """
+        if link is None:
+            link = numpy.arange(len(self.speed))
+            last = slice(None)
+        else:
+            link = numpy.asarray(link, dtype = int)
+            # Reduces the delta to unique links, keeping their last values.
+            M = len(link)
+            link, last = numpy.unique(link[::-1], return_index = True)
+            last = M - 1 - last
+        recompute = numpy.zeros(len(link), dtype = bool)
+        rescale = numpy.zeros(len(link), dtype = bool)
+        if speed is not None:
+            speed = numpy.asarray(speed, dtype = float)[last]
+            recompute |= speed != self.speed[link]
+            self.speed[link] = speed
+        if fleet is not None:
+            fleet = numpy.asarray(fleet, dtype = float)[last]
+            recompute |= (fleet != self.fleet[link]) \
+                .reshape(len(link), -1).any(axis = 1)
+            self.fleet[link] = fleet
+        if flow is not None:
+            flow = numpy.asarray(flow, dtype = float)[last]
+            rescale |= flow != self.flow[link]
+            self.flow[link] = flow
+
+        recomputed = numpy.unique(link[recompute])
+        updated = numpy.unique(link[recompute | rescale])
+        if len(recomputed) > 0:
+            self.emission_factor[..., recomputed] \
+                = self._EmissionFactor(recomputed)
+        emission = self.emission_factor[..., updated] * self.flow[updated] \
+            * self.length[updated]
+        self.total += (emission - self.emission[..., updated]).sum(axis = -1)
+        self.emission[..., updated] = emission
+        self.Nrecomputed = len(recomputed)
+        self.Nupdated = len(updated)
+        return self.Nrecomputed
+
+
+def _interpolate_grid(table, row, x):
+    """Interpolates linearly the rows of a table on a regular grid.
+
+    @param table The table, with shape (Nrow, Ngrid).
+
+    @param row The row indexes (array).
+
+    @param x The positions on the grid, as fractional indexes in [0, Ngrid -
+    1], with the shape of 'row'. They may be NaN.
+
+    @return The interpolated values, with the shape of 'row', and NaN where
+    'x' is NaN.
+    """
+    Ngrid = table.shape[1]
+    undefined = numpy.isnan(x)
+    x = numpy.where(undefined, 0., x)
+    # Avoids falling in the previous interval because of round-off.
+    x_round = numpy.round(x)
+    x = numpy.where(numpy.abs(x - x_round) < 1.e-9, x_round, x)
+    i = numpy.clip(numpy.floor(x), 0, Ngrid - 2).astype(int)
+    w = x - i
+    value = numpy.where(w == 0., table[row, i],
+                        (1. - w) * table[row, i] + w * table[row, i + 1])
+    return numpy.where(undefined, numpy.nan, value)
+
+
+def load_emission_factor_table(filename):
+    """Loads an emission factor table saved by EmissionFactorTable.Save.
+    """
+    data = numpy.load(filename)
+    speed_min, speed_step = data["speed"]
+    error = []
+    for name in ["max_relative_error", "max_absolute_error"]:
+        # The absolute errors are missing from the older files.
+        if name in data.files and len(data[name]) != 0:
+            error.append(data[name])
+        else:
+            error.append(None)
+    return EmissionFactorTable(speed_min, speed_step, data["key"],
+                               data["table"], *error)
+
+
+# Arguments of Copert.ParallelLinkEmission, inherited by the worker processes.
+_parallel_link_data = None
+
+
+def _link_emission_chunk(chunk):
+    """Computes the emissions on a chunk of links, for
+    Copert.ParallelLinkEmission.
+
+    @param chunk The first link and the last link + 1 of the chunk.
+
+    @return The first link, the last link + 1, the emissions on the chunk and
+    the computation time in seconds.
+    """
+    start, end = chunk
+    initial_time = time.time()
+    copert, pollutant, speed, length, flow, fleet, copert_class, \
+        engine_capacity = _parallel_link_data
+    emission = copert.LinkEmission(pollutant, speed[start:end],
+                                   length[start:end], flow[start:end],
+                                   fleet[start:end], copert_class,
+                                   engine_capacity)
+    return start, end, emission, time.time() - initial_time
@@ -145,9 +145,11 @@ selected_zone = [[x_min, y_max],
                  [x_max, y_max]]
 selected_zone.append(selected_zone[0]) # to close the polygon.
 
-# Retrieving the coordinates and IDs of the highways.
+# Retrieving the coordinates and IDs of the highways. They are cached in
+# "output", so that the OSM file is not parsed again on the next runs.
 highway_coordinate, highway_osmid \
-    = osm_network.retrieve_highway(osm_file, selected_zone, tolerance, Ncore)
+    = osm_network.retrieve_highway(osm_file, selected_zone, tolerance, Ncore,
+                                   cache_directory = "output")
 
 # Line width associated to the largest emission.
 s = 4.
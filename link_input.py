@@ -0,0 +1,208 @@
+# Copyright (C) 2015, ENPC, INRIA
+# Author(s): Ruiwei Chen, Vivien Mallet
+#
+# This file is part of a program for the computation of air pollutant
+# emissions.
+#
+# This file is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 2.1 of the License, or (at your option)
+# any later version.
+#
+# This file is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this file. If not, see http://www.gnu.org/licenses/.
+
+# This file reads the link input files (see 'example_emission_link_level.py')
+# by chunks of links, so that the emissions of networks larger than the
+# memory can be computed chunk after chunk.
+
+
+import os
+import itertools
+import numpy
+
+
+# The link input files, as (name of the array, file name, number of
+# columns). All files have one line per link, in the same order.
+link_file = [("link", "link_osm.dat", 2),
+             ("flow", "flow.dat", 1),
+             ("speed", "speed.dat", 1),
+             ("passenger_car_proportion", "passenger_car_proportion.dat", 1),
+             ("gasoline_proportion", "gasoline_proportion.dat", 1),
+             ("engine_capacity_gasoline", "engine_capacity_gasoline.dat", 3),
+             ("engine_capacity_diesel", "engine_capacity_diesel.dat", 3),
+             ("copert_class_gasoline",
+              "copert_class_proportion_gasoline.dat", 14),
+             ("copert_class_diesel",
+              "copert_class_proportion_diesel.dat", 14)]
+
+
+def _data_line(f):
+    """Iterates over the lines of a text file that hold data, that is, the
+    non-blank lines once the comments (starting with '#') are removed, as
+    numpy.loadtxt does.
+
+    @param f The file object.
+    """
+    for line in f:
+        if "#" in line:
+            line = line[:line.index("#")]
+        if line.strip():
+            yield line
+
+
+def read_link_chunk(directory = "input", chunk_size = 100000):
+    """Reads the link input files in lockstep, by chunks of links. Only one
+    chunk of every file is in memory at a time.
+
+    @param directory The directory of the files listed in 'link_file'.
+
+    @param chunk_size The number of links in a chunk. The last chunk may be
+    smaller.
+
+    @return A generator of dictionaries, one per chunk, that map the names
+    in 'link_file' to the arrays of the chunk. The arrays have one row per
+    link, and the arrays of one-column files are one-dimensional.
+    """
+    if chunk_size < 1:
+        raise Exception, "The chunk size must be at least 1."
+    f = [open(os.path.join(directory, filename), "r")
+         for name, filename, Ncolumn in link_file]
+    try:
+        line = [_data_line(x) for x in f]
+        while True:
+            chunk = {}
+            Nlink = None
+            for i in range(len(link_file)):
+                name, filename, Ncolumn = link_file[i]
+                text = list(itertools.islice(line[i], chunk_size))
+                if Nlink is None:
+                    Nlink = len(text)
+                elif len(text) != Nlink:
+                    raise Exception, "The link input files do not have the " \
+                        + "same number of lines (see \"" + filename + "\")."
+                value = numpy.fromstring(" ".join(text), sep = " ")
+                # The total number of values is not enough: a short line
+                # followed by a long one would shift all later values.
+                if len(value) != Nlink * Ncolumn \
+                        or Ncolumn > 1 and any(len(l.split()) != Ncolumn
+                                               for l in text):
+                    raise Exception, "There should be " + str(Ncolumn) \
+                        + " column(s) in \"" + filename + "\"."
+                if Ncolumn == 1:
+                    chunk[name] = value
+                else:
+                    chunk[name] = value.reshape(Nlink, Ncolumn)
+            if Nlink == 0:
+                return
+            yield chunk
+    finally:
+        for x in f:
+            x.close()
+
+
+def link_fleet(chunk):
+    """Computes the proportion of the flow in each category of passenger
+    cars, from a chunk returned by 'read_link_chunk'.
+
+    @param chunk The dictionary of the input arrays of a chunk of links.
+
+    @return The proportions with shape (Nlink, 2, 14, 3), for the dimensions
+    link, engine type (gasoline/diesel), COPERT class and engine capacity, as
+    expected by Copert.LinkEmission.
+    """
+    gasoline = chunk["gasoline_proportion"]
+    engine_type_distribution = numpy.column_stack([gasoline, 1. - gasoline])
+    copert_class_distribution \
+        = numpy.stack([chunk["copert_class_gasoline"],
+                       chunk["copert_class_diesel"]], axis = 1)
+    engine_capacity_distribution \
+        = numpy.stack([chunk["engine_capacity_gasoline"],
+                       chunk["engine_capacity_diesel"]], axis = 1)
+    return chunk["passenger_car_proportion"][:, None, None, None] \
+        * engine_type_distribution[:, :, None, None] \
+        * copert_class_distribution[:, :, :, None] \
+        * engine_capacity_distribution[:, :, None, :]
+
+
+def convert_link_input(input_directory, output_directory,
+                       chunk_size = 100000):
+    """Converts the link input files into a binary format that can be
+    memory-mapped by 'load_link_input'. Every array of 'link_file' is written
+    in its own NumPy binary file (.npy) of float64, with one row per link, so
+    that a computation only reads the arrays it uses. The file "header.txt"
+    lists the number of links and the shape of every array.
+
+    @param input_directory The directory of the files listed in 'link_file'.
+
+    @param output_directory The directory where the binary files are
+    written. It must exist.
+
+    @param chunk_size The number of links converted at a time.
+    """
+    f = open(os.path.join(input_directory, link_file[0][1]), "r")
+    Nlink = sum(1 for line in _data_line(f))
+    f.close()
+
+    array = {}
+    for name, filename, Ncolumn in link_file:
+        if Ncolumn == 1:
+            shape = (Nlink,)
+        else:
+            shape = (Nlink, Ncolumn)
+        array[name] = numpy.lib.format \
+            .open_memmap(os.path.join(output_directory, name + ".npy"),
+                         mode = "w+", dtype = float, shape = shape)
+    start = 0
+    for chunk in read_link_chunk(input_directory, chunk_size):
+        end = start + len(chunk["speed"])
+        if end > Nlink:
+            raise Exception, "The link input files have more lines than \"" \
+                + link_file[0][1] + "\"."
+        for name in array:
+            array[name][start:end] = chunk[name]
+        start = end
+    if start != Nlink:
+        raise Exception, "The link input files have fewer lines than \"" \
+            + link_file[0][1] + "\"."
+    for name in array:
+        array[name].flush()
+    del array
+
+    header = open(os.path.join(output_directory, "header.txt"), "w")
+    header.write("Nlink " + str(Nlink) + "\n")
+    for name, filename, Ncolumn in link_file:
+        header.write(name + " " + str(Ncolumn) + "\n")
+    header.close()
+
+
+def load_link_input(directory):
+    """Memory-maps the link input arrays written by 'convert_link_input'.
+    No data is read until the arrays are accessed, and only the accessed
+    parts are then read.
+
+    @param directory The directory of the binary files.
+
+    @return A dictionary that maps the names in 'link_file' to read-only
+    arrays with one row per link, like the chunks of 'read_link_chunk'.
+    """
+    header = open(os.path.join(directory, "header.txt"), "r")
+    line = [l.split() for l in header.readlines()]
+    header.close()
+    Nlink = int(line[0][1])
+    data = {}
+    for name, Ncolumn in line[1:]:
+        array = numpy.load(os.path.join(directory, name + ".npy"),
+                           mmap_mode = "r")
+        if len(array) != Nlink or array.size != Nlink * int(Ncolumn):
+            raise Exception, "The shape of \"" + name + ".npy\" does not " \
+                + "match the header of \"" + directory + "\"."
+        # A plain array view of the memory map, which is faster to index than
+        # numpy.memmap.
+        data[name] = array.view(numpy.ndarray)
+    return data
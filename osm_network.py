@@ -21,6 +21,9 @@
 
 
 from imposm.parser import OSMParser
+import hashlib
+import os
+import tempfile
 import numpy
 
 
@@ -46,6 +49,38 @@ def point_inside_polygon(x, y, poly):
     return inside
 
 
+# Determines which points are inside a given polygon, with the same ray
+# casting as 'point_inside_polygon', vectorized over the points and the edges
+# of the polygon. 'x' and 'y' are the arrays of the coordinates of the
+# points, and 'poly' is a list of (x, y) pairs. The points are processed by
+# chunks so that the temporary (point, edge) arrays hold at most about
+# 'Nmax' elements. Returns a Boolean array.
+def points_inside_polygon(x, y, poly, Nmax = 1000000):
+    x = numpy.asarray(x, dtype = float)
+    y = numpy.asarray(y, dtype = float)
+    poly = numpy.asarray(poly, dtype = float)
+    # The edges (p1, p2) of the polygon. The edges with p1y == p2y are never
+    # crossed.
+    p1x, p1y = poly[:, 0], poly[:, 1]
+    p2x, p2y = numpy.roll(poly[:, 0], -1), numpy.roll(poly[:, 1], -1)
+    edge = p1y != p2y
+    p1x, p1y, p2x, p2y = p1x[edge], p1y[edge], p2x[edge], p2y[edge]
+    y_min, y_max = numpy.minimum(p1y, p2y), numpy.maximum(p1y, p2y)
+    x_max = numpy.maximum(p1x, p2x)
+    vertical = p1x == p2x
+
+    inside = numpy.zeros(x.shape, dtype = bool)
+    chunk = max(1, Nmax // max(1, len(p1x)))
+    for start in range(0, len(x), chunk):
+        X = x[start:start + chunk, None]
+        Y = y[start:start + chunk, None]
+        xinters = (Y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+        crossing = (Y > y_min) & (Y <= y_max) & (X <= x_max) \
+            & (vertical | (X <= xinters))
+        inside[start:start + chunk] = crossing.sum(axis = 1) % 2 == 1
+    return inside
+
+
 # Simple class that handles the parsed OSM data in order to select the points
 # inside the domain and the coordinates of the points around the domain. The
 # domain is defined as a closed N-point polygon in 'selected_zone'
@@ -64,17 +99,41 @@ class Point(object):
         self.x_max = max([x[0] for x in selected_zone]) + tolerance
         self.y_min = min([x[1] for x in selected_zone]) - tolerance
         self.y_max = max([x[1] for x in selected_zone]) + tolerance
+        # Bounding box of the domain itself, outside which no point is
+        # inside the domain.
+        self.zone_x_min = min([x[0] for x in selected_zone])
+        self.zone_x_max = max([x[0] for x in selected_zone])
+        self.zone_y_min = min([x[1] for x in selected_zone])
+        self.zone_y_max = max([x[1] for x in selected_zone])
 
+    # 'coord' is a batch of (osmid, x, y) as delivered by the parser. The
+    # batch is converted to arrays, the points outside the bounding boxes are
+    # discarded, and the polygon test is applied to the remaining points at
+    # once.
     def select(self, coord):
-        for osmid, x, y in coord:
-            # Selection of the points that are inside the domain.
-            if point_inside_polygon(x, y, self.selected_zone):
-                self.inside_zone.append(osmid)
-            # Getting the ids of the coordinates inside the domain or in the
-            # vicinity of the domain.
-            if x < self.x_max and x > self.x_min \
-                    and  y < self.y_max and y > self.y_min:
-                self.coordinate[osmid] = (x, y)
+        if len(coord) == 0:
+            return
+        osmid, x, y = zip(*coord)
+        osmid = numpy.array(osmid)
+        x = numpy.array(x, dtype = float)
+        y = numpy.array(y, dtype = float)
+
+        # Selection of the points that are inside the domain.
+        candidate = numpy.flatnonzero((x >= self.zone_x_min)
+                                      & (x <= self.zone_x_max)
+                                      & (y > self.zone_y_min)
+                                      & (y <= self.zone_y_max))
+        inside = points_inside_polygon(x[candidate], y[candidate],
+                                       self.selected_zone)
+        self.inside_zone.extend(osmid[candidate[inside]].tolist())
+
+        # Getting the ids of the coordinates inside the domain or in the
+        # vicinity of the domain.
+        vicinity = numpy.flatnonzero((x < self.x_max) & (x > self.x_min)
+                                     & (y < self.y_max) & (y > self.y_min))
+        self.coordinate.update(zip(osmid[vicinity].tolist(),
+                                   zip(x[vicinity].tolist(),
+                                       y[vicinity].tolist())))
 
 
 # Simple class that handles the parsed OSM data in order to identify all
@@ -83,6 +142,11 @@ class Highway(object):
     def __init__(self, point):
         # Set of all nodes inside the zone.
         self.point_inside_zone = set(point.inside_zone)
+        # List of the nodes inside the zone, which may still be filled after
+        # the creation of the object (see 'store').
+        self.point_inside_zone_source = point.inside_zone
+        # Highways stored by 'store', as (osmid, refs).
+        self.stored = []
         # Points that describe the highways.
         self.point = []
         # Unsorted points that describe the highways, in a set.
@@ -97,16 +161,58 @@ class Highway(object):
                 self.point.append(refs)
                 self.osmid.append(osmid)
 
+    # Stores all highways, whether they cross the domain or not. This is used
+    # when the ways are parsed together with the points, so that the points
+    # inside the domain are not known yet. The highways are then selected by
+    # 'select_stored', after the parsing.
+    def store(self, ways):
+        for osmid, tags, refs in ways:
+            if "highway" in tags:
+                self.stored.append((osmid, refs))
+
+    def select_stored(self):
+        self.point_inside_zone = set(self.point_inside_zone_source)
+        for osmid, refs in self.stored:
+            if not set(refs).isdisjoint(self.point_inside_zone):
+                self.point.append(refs)
+                self.osmid.append(osmid)
+        self.stored = []
+
+
+# If 'single_pass' is True, the OSM file is parsed only once: the points and
+# the ways are retrieved in the same pass, all highways are kept in memory,
+# and the highways that cross the domain are selected after the pass. This
+# halves the parsing time, at the expense of the memory for the references
+# of all highways of the file. If 'single_pass' is False, the file is parsed
+# twice, first for the points and then for the ways, and only the highways
+# that cross the domain are kept in memory.
+# If 'cache_directory' is not None, the result is cached in this directory
+# (see 'highway_cache_file'), and it is read from the cache, without parsing
+# the OSM file, as long as the OSM file is unchanged.
+def retrieve_highway(osm_file, selected_zone, tolerance, Ncore = 1,
+                     single_pass = True, cache_directory = None):
+    if cache_directory is not None:
+        cache_file = highway_cache_file(cache_directory, osm_file,
+                                        selected_zone, tolerance)
+        cached = load_highway(cache_file, osm_file)
+        if cached is not None:
+            return cached
 
-def retrieve_highway(osm_file, selected_zone, tolerance, Ncore = 1):
     # Parses the OSM file.
     point = Point(selected_zone, tolerance)
-    p = OSMParser(concurrency = Ncore, coords_callback = point.select)
-    p.parse(osm_file)
+    if single_pass:
+        highway = Highway(point)
+        p = OSMParser(concurrency = Ncore, coords_callback = point.select,
+                      ways_callback = highway.store)
+        p.parse(osm_file)
+        highway.select_stored()
+    else:
+        p = OSMParser(concurrency = Ncore, coords_callback = point.select)
+        p.parse(osm_file)
 
-    highway = Highway(point)
-    p = OSMParser(concurrency = Ncore, ways_callback = highway.select)
-    p.parse(osm_file)
+        highway = Highway(point)
+        p = OSMParser(concurrency = Ncore, ways_callback = highway.select)
+        p.parse(osm_file)
 
     highway.point_set = set([item for refs in highway.point for item in refs])
 
@@ -128,4 +234,107 @@ def retrieve_highway(osm_file, selected_zone, tolerance, Ncore = 1):
         except:
             pass
 
+    if cache_directory is not None:
+        save_highway(cache_file, osm_file, highway_coordinate, highway_osmid)
+
+    return highway_coordinate, highway_osmid
+
+
+# Returns the SHA-1 hash of the content of a file, in hexadecimal. The file
+# is read by blocks so that large OSM files are not loaded in memory.
+def hash_file(filename, block_size = 2 ** 20):
+    digest = hashlib.sha1()
+    f = open(filename, "rb")
+    block = f.read(block_size)
+    while block:
+        digest.update(block)
+        block = f.read(block_size)
+    f.close()
+    return digest.hexdigest()
+
+
+# Returns the path of the cache file, in 'cache_directory', of the highways
+# extracted from 'osm_file' for the domain 'selected_zone' and the tolerance
+# 'tolerance'. The name of the file is a hash of the path of the OSM file,
+# of the polygon and of the tolerance. The state of the OSM file (size,
+# modification time and content hash) is stored in the cache file and
+# checked by 'load_highway'.
+def highway_cache_file(cache_directory, osm_file, selected_zone, tolerance):
+    digest = hashlib.sha1(os.path.abspath(osm_file))
+    digest.update(numpy.array(selected_zone, dtype = float).tostring())
+    digest.update(repr(float(tolerance)))
+    return os.path.join(cache_directory,
+                        "highway-" + digest.hexdigest() + ".npz")
+
+
+# Writes the highways returned by 'retrieve_highway' in a cache file, as
+# packed arrays: 'coordinate' holds the coordinates of all points of all
+# highways, with shape (Npoint, 2), the points of the i-th highway are
+# 'coordinate[offset[i]:offset[i + 1]]', and 'osmid' holds the OSM IDs of the
+# highways. The size, the modification time and the content hash of
+# 'osm_file' are stored as well. The file is first written under a temporary
+# name and then renamed, so that concurrent processes never read a partial
+# cache.
+def save_highway(cache_file, osm_file, highway_coordinate, highway_osmid):
+    offset = numpy.zeros(len(highway_coordinate) + 1, dtype = numpy.int64)
+    offset[1:] = numpy.cumsum([len(refs) for refs in highway_coordinate])
+    coordinate = numpy.array([x for refs in highway_coordinate for x in refs],
+                             dtype = float).reshape(-1, 2)
+    osmid = numpy.array(highway_osmid, dtype = numpy.int64)
+    write_highway_cache(cache_file, os.stat(osm_file), hash_file(osm_file),
+                        coordinate = coordinate, offset = offset,
+                        osmid = osmid)
+
+
+# Writes a cache file with the arrays 'array' (see 'save_highway'), the size
+# and the modification time in 'state' (as returned by os.stat) and the
+# content hash 'osm_hash' of the OSM file.
+def write_highway_cache(cache_file, state, osm_hash, **array):
+    descriptor, temporary \
+        = tempfile.mkstemp(suffix = ".npz",
+                           dir = os.path.dirname(os.path.abspath(cache_file)))
+    f = os.fdopen(descriptor, "wb")
+    numpy.savez(f, osm_size = numpy.array(state.st_size),
+                osm_mtime = numpy.array(state.st_mtime),
+                osm_hash = numpy.array(osm_hash), **array)
+    f.close()
+    os.rename(temporary, cache_file)
+
+
+# Reads the highways written by 'save_highway' in 'cache_file'. Returns None
+# if the cache file is missing or unreadable, or if 'osm_file' changed since
+# the cache was written. The OSM file is considered unchanged if it has the
+# same size and modification time, or else the same size and content hash.
+# In the latter case, the new modification time is written in the cache, so
+# that the OSM file is not hashed again on the next calls. Otherwise, returns
+# the highway coordinates and OSM IDs as 'retrieve_highway' does.
+def load_highway(cache_file, osm_file):
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        data = numpy.load(cache_file)
+        array = dict((name, data[name])
+                     for name in ["coordinate", "offset", "osmid"])
+        osm_size = int(data["osm_size"])
+        osm_mtime = float(data["osm_mtime"])
+        osm_hash = str(data["osm_hash"])
+        data.close()
+        state = os.stat(osm_file)
+    except Exception:
+        return None
+    if osm_size != state.st_size:
+        return None
+    if osm_mtime != state.st_mtime:
+        if osm_hash != hash_file(osm_file):
+            return None
+        try:
+            write_highway_cache(cache_file, state, osm_hash, **array)
+        except (IOError, OSError):
+            # The cache is still valid, e.g. in a read-only directory.
+            pass
+    coordinate = [tuple(x) for x in array["coordinate"].tolist()]
+    offset = array["offset"].tolist()
+    highway_osmid = array["osmid"].tolist()
+    highway_coordinate = [coordinate[offset[i]:offset[i + 1]]
+                          for i in range(len(highway_osmid))]
     return highway_coordinate, highway_osmid